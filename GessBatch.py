@@ -0,0 +1,223 @@
+# Description: Features of many Gess positions at once, computed with NumPy over a batch of boards.
+#
+# NumPy is only needed by this module. The rest of the game runs without it.
+
+from GessGame import GessGame
+
+try:
+    import numpy
+except ImportError:     # Optional dependency, checked when a BoardBatch is created.
+    numpy = None
+
+_SIZE = 20
+_BOARD_BYTES = 50       # 400 squares, one bit each, as in GessGame.get_bitboards.
+_STATE_CODES = {"UNFINISHED": 0, "BLACK_WON": 1, "WHITE_WON": -1}     # Codes of BoardBatch.get_states.
+_STATES = {code: state for state, code in _STATE_CODES.items()}
+# Columns of BoardBatch.features.
+FEATURES = ("black_stones", "white_stones", "black_rings", "white_rings", "black_pieces", "white_pieces",
+            "black_superpieces", "white_superpieces", "black_directions", "white_directions")
+
+
+def _window(mask, row, column):
+    """
+    Returns the part of a batch of boards seen from every center, one square away in a direction.
+    :param mask: Array of shape (N, 20, 20).
+    :param row: -1, 0 or 1, the row of the square relative to the center.
+    :param column: -1, 0 or 1, the column of the square relative to the center.
+    :return: Array of shape (N, 18, 18), where [n, r, c] is mask[n, r + 1 + row, c + 1 + column].
+    """
+    return mask[:, 1 + row:_SIZE - 1 + row, 1 + column:_SIZE - 1 + column]
+
+
+def _footprint_sum(mask):
+    """
+    Counts the squares set in the 3x3 footprint of every center, for a whole batch.
+    :param mask: Array of shape (N, 20, 20), of bool or small ints.
+    :return: Array of shape (N, 18, 18) of the counts, for the centers [1..18, 1..18].
+    """
+    total = numpy.zeros((mask.shape[0], _SIZE - 2, _SIZE - 2), dtype=numpy.int16)
+    for row in (-1, 0, 1):
+        for column in (-1, 0, 1):
+            total += _window(mask, row, column)
+    return total
+
+
+def _pad(centers):
+    """
+    Puts the centers [1..18, 1..18] back on full boards, with the edges False or 0.
+    :param centers: Array of shape (N, 18, 18).
+    :return: Array of shape (N, 20, 20).
+    """
+    boards = numpy.zeros((centers.shape[0], _SIZE, _SIZE), dtype=centers.dtype)
+    boards[:, 1:_SIZE - 1, 1:_SIZE - 1] = centers
+    return boards
+
+
+class BoardBatch:
+    """
+    Description: N positions held as one (N, 20, 20) int8 array, 1 for a black stone, -1 for a white stone and
+    0 for an empty square, the player to move of each, 1 for Black and -1 for White, and the game state of each,
+    0 for "UNFINISHED", 1 for "BLACK_WON" and -1 for "WHITE_WON".
+    Responsibilities:
+    1) Convert GessGame positions to and from the batch.
+    2) Find the stones, rings, pieces and movable directions of every position with whole-array operations,
+    using the same rules as GessGame: a ring is an empty center surrounded by eight stones of one player, a
+    piece is a footprint with stones of one player only and not just the center, and a piece can move in the
+    direction of every stone around its center, any distance if its center holds a stone (check_movement).
+    """
+    def __init__(self, boards, players, states=None):
+        """
+        Creates a batch from arrays.
+        :param boards: Array-like of shape (N, 20, 20), see the class description.
+        :param players: Array-like of shape (N,), 1 where Black is to move and -1 where White is.
+        :param states: Array-like of shape (N,) of the game states, see the class description, or None to work
+        them out from the rings like GessGame.make_move does.
+        """
+        if numpy is None:
+            raise ImportError("BoardBatch needs NumPy, which is not installed")
+        self._boards = numpy.ascontiguousarray(boards, dtype=numpy.int8)
+        self._players = numpy.ascontiguousarray(players, dtype=numpy.int8)
+        if self._boards.ndim != 3 or self._boards.shape[1:] != (_SIZE, _SIZE):
+            raise ValueError("boards must have the shape (N, 20, 20)")
+        if self._players.shape != self._boards.shape[:1]:
+            raise ValueError("players must have the shape (N,)")
+        if states is None:
+            counts = self.ring_counts()
+            states = numpy.where(counts[:, 1] == 0, 1, numpy.where(counts[:, 0] == 0, -1, 0))
+        self._states = numpy.ascontiguousarray(states, dtype=numpy.int8)
+        if self._states.shape != self._boards.shape[:1]:
+            raise ValueError("states must have the shape (N,)")
+
+    @classmethod
+    def from_games(cls, games):
+        """
+        Creates a batch from the current positions of some games.
+        :param games: Iterable of GessGame.
+        :return: The BoardBatch.
+        """
+        if numpy is None:
+            raise ImportError("BoardBatch needs NumPy, which is not installed")
+        black_bytes = []
+        white_bytes = []
+        players = []
+        states = []
+        for game in games:
+            black, white = game.get_bitboards()
+            black_bytes.append(black.to_bytes(_BOARD_BYTES, "little"))
+            white_bytes.append(white.to_bytes(_BOARD_BYTES, "little"))
+            players.append(1 if game.get_player() == "BLACK" else -1)
+            states.append(_STATE_CODES[game.get_game_state()])
+        black = numpy.unpackbits(numpy.frombuffer(b"".join(black_bytes), dtype=numpy.uint8), bitorder="little")
+        white = numpy.unpackbits(numpy.frombuffer(b"".join(white_bytes), dtype=numpy.uint8), bitorder="little")
+        boards = black.astype(numpy.int8) - white.astype(numpy.int8)
+        return cls(boards.reshape(len(players), _SIZE, _SIZE), numpy.array(players, dtype=numpy.int8),
+                   numpy.array(states, dtype=numpy.int8))
+
+    def to_games(self):
+        """
+        Creates a GessGame for every position of the batch, with its player and game state, with
+        GessGame.from_position.
+        :param: None
+        :return: Returns a list of GessGame.
+        """
+        count = len(self)
+        black = numpy.packbits((self._boards == 1).reshape(count, -1), axis=1, bitorder="little")
+        white = numpy.packbits((self._boards == -1).reshape(count, -1), axis=1, bitorder="little")
+        games = []
+        for index in range(count):
+            games.append(GessGame.from_position(int.from_bytes(black[index].tobytes(), "little"),
+                                                int.from_bytes(white[index].tobytes(), "little"),
+                                                "BLACK" if self._players[index] == 1 else "WHITE",
+                                                _STATES[int(self._states[index])]))
+        return games
+
+    def __len__(self):
+        return self._boards.shape[0]
+
+    def get_boards(self):
+        """
+        Returns the (N, 20, 20) int8 array of the boards.
+        """
+        return self._boards
+
+    def get_players(self):
+        """
+        Returns the (N,) int8 array of the players to move, 1 for Black and -1 for White.
+        """
+        return self._players
+
+    def get_states(self):
+        """
+        Returns the (N,) int8 array of the game states, 0 for "UNFINISHED", 1 for "BLACK_WON" and -1 for
+        "WHITE_WON".
+        """
+        return self._states
+
+    def stone_counts(self):
+        """
+        Counts the stones of each player.
+        :return: Array of shape (N, 2), the black then the white count of each position.
+        """
+        return numpy.stack([(self._boards == 1).sum(axis=(1, 2)), (self._boards == -1).sum(axis=(1, 2))], axis=1)
+
+    def rings(self):
+        """
+        Finds the rings of each player.
+        :return: Returns (black, white), two bool arrays of shape (N, 20, 20) set on the center of every ring.
+        """
+        empty = _window(self._boards == 0, 0, 0)
+        found = []
+        for stone in (1, -1):
+            own = self._boards == stone
+            ring = empty.copy()
+            for row in (-1, 0, 1):
+                for column in (-1, 0, 1):
+                    if row or column:
+                        ring &= _window(own, row, column)
+            found.append(_pad(ring))
+        return found[0], found[1]
+
+    def ring_counts(self):
+        """
+        Counts the rings of each player.
+        :return: Array of shape (N, 2), the black then the white count of each position.
+        """
+        black, white = self.rings()
+        return numpy.stack([black.sum(axis=(1, 2)), white.sum(axis=(1, 2))], axis=1)
+
+    def footprint_counts(self):
+        """
+        Counts the stones of each player in the 3x3 footprint of every center.
+        :return: Returns (black, white), two int16 arrays of shape (N, 20, 20), 0 on the edges.
+        """
+        return _pad(_footprint_sum(self._boards == 1)), _pad(_footprint_sum(self._boards == -1))
+
+    def pieces(self):
+        """
+        Finds the centers of the pieces each player could move, like is_black_piece and is_white_piece.
+        :return: Returns (black, white), two bool arrays of shape (N, 20, 20).
+        """
+        black, white = self.footprint_counts()
+        black_pieces = (white == 0) & (black > 0) & ~((black == 1) & (self._boards == 1))
+        white_pieces = (black == 0) & (white > 0) & ~((white == 1) & (self._boards == -1))
+        return black_pieces, white_pieces
+
+    def features(self):
+        """
+        Computes the features of every position, see FEATURES for the columns. The directions of a player are
+        the movable directions of all of its pieces added up, and its superpieces are the pieces with a stone
+        on their center.
+        :return: int32 array of shape (N, len(FEATURES)).
+        """
+        black_counts, white_counts = self.footprint_counts()
+        black_pieces, white_pieces = self.pieces()
+        black_centers = self._boards == 1
+        white_centers = self._boards == -1
+        columns = [self.stone_counts(), self.ring_counts(),
+                   numpy.stack([black_pieces.sum(axis=(1, 2)), white_pieces.sum(axis=(1, 2))], axis=1),
+                   numpy.stack([(black_pieces & black_centers).sum(axis=(1, 2)),
+                                (white_pieces & white_centers).sum(axis=(1, 2))], axis=1),
+                   numpy.stack([numpy.where(black_pieces, black_counts - black_centers, 0).sum(axis=(1, 2)),
+                                numpy.where(white_pieces, white_counts - white_centers, 0).sum(axis=(1, 2))],
+                               axis=1)]
+        return numpy.concatenate(columns, axis=1).astype(numpy.int32)
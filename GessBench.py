@@ -0,0 +1,85 @@
+# Description: Measures the per-move latency of GessGame.make_move by replaying a corpus of recorded games.
+
+import argparse
+import json
+import sys
+import time
+
+from GessGame import GessGame, decode_move
+from GessRunner import RandomPolicy, play_game
+
+
+def load_corpus(path):
+    """
+    Reads the games written by GessRunner, one JSON object per line.
+    :param path: Path of the file.
+    :return: Returns a list of games, each a list of encoded moves.
+    """
+    games = []
+    with open(path) as corpus:
+        for line in corpus:
+            if line.strip():
+                games.append(json.loads(line)["moves"])
+    return games
+
+
+def random_corpus(count, seed=0):
+    """
+    Records random games to replay, the same ones every time for a given seed.
+    :param count: Number of games.
+    :param seed: Seed of the first game.
+    :return: Returns a list of games, each a list of encoded moves.
+    """
+    policy = RandomPolicy()
+    return [play_game((index, seed + index, policy, policy, 200, 0))[3] for index in range(count)]
+
+
+def replay(games, strings=False):
+    """
+    Replays every game with make_move, timing only the make_move calls.
+    :param games: List of games, each a list of encoded moves.
+    :param strings: If True, passes each move to make_move as two strings instead of as its code.
+    :return: Returns (moves, seconds), the number of moves replayed and the time make_move took.
+    """
+    timer = time.perf_counter
+    moves = 0
+    elapsed = 0.0
+    for game_moves in games:
+        game = GessGame()
+        for code in game_moves:
+            move = decode_move(code) if strings else (code,)
+            start = timer()
+            result = game.make_move(*move)
+            elapsed += timer() - start
+            if result is False:
+                raise ValueError("recorded move %r was rejected" % (move,))
+            moves += 1
+    return moves, elapsed
+
+
+def main():
+    """
+    Replays a corpus from the command line and reports the latency on stderr. Run it with stdout sent to a file
+    or /dev/null to measure any output make_move writes the way a service would.
+    """
+    parser = argparse.ArgumentParser(description="Measure the per-move latency of GessGame.make_move.")
+    parser.add_argument("corpus", nargs="?", help="games written by GessRunner, random games if not given")
+    parser.add_argument("--games", type=int, default=200, help="number of random games")
+    parser.add_argument("--strings", action="store_true", help="pass moves as two strings instead of codes")
+    parser.add_argument("--repeat", type=int, default=3, help="replays of the corpus, the fastest is reported")
+    arguments = parser.parse_args()
+
+    if arguments.corpus:
+        games = load_corpus(arguments.corpus)
+    else:
+        games = random_corpus(arguments.games)
+    best = None
+    for repeat in range(arguments.repeat):
+        moves, elapsed = replay(games, arguments.strings)
+        if best is None or elapsed < best:
+            best = elapsed
+    print("%d games, %d moves: %.2f us per move" % (len(games), moves, best / moves * 1e6), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
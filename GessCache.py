@@ -0,0 +1,254 @@
+# Description: A cache of the legal moves, rings and evaluations of positions, keyed by GessGame.get_hash and the
+# game state.
+
+import argparse
+import collections
+import pickle
+import sys
+import time
+
+from GessGame import GessGame
+from GessSearch import material_evaluate
+
+_ENTRY_BYTES = 400      # Rough size of an entry before its moves and evaluations, for the memory budget.
+_MOVE_BYTES = 36        # Rough size of each cached move: an int and its slot in a tuple.
+_EVALUATION_BYTES = 200     # Rough size of each cached evaluation: its key, score and dict slot.
+
+
+class PositionCache:
+    """
+    Description: Remembers what was worked out about positions so that asking again is a dictionary lookup.
+    Responsibilities:
+    1) Cache the legal moves, the rings and any number of evaluations of each position. Entries are filled in
+    the first time each of them is asked for.
+    2) Keep the approximate memory used under a budget by evicting the least recently used positions.
+    3) Save the cache to a file and load it back, for example to start a service with the openings preloaded.
+    The hash of a position can collide with another, so every entry also keeps the bitboards and player of its
+    position and is only used for that exact position. The game state is part of both, as a finished game has
+    no legal moves even where an unfinished one on the same board would.
+    """
+    def __init__(self, budget=64 * 1024 * 1024):
+        """
+        Creates an empty cache.
+        :param budget: Approximate memory the cache may use, in bytes.
+        """
+        if budget < 1:
+            raise ValueError("budget must be at least 1 byte")
+        self._budget = budget
+        self._size = 0
+        self._entries = collections.OrderedDict()      # (hash, game state) to entry, least recently used first.
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_budget(self):
+        """
+        Returns the approximate memory the cache may use, in bytes.
+        """
+        return self._budget
+
+    def get_size(self):
+        """
+        Returns the approximate memory the cache uses, in bytes.
+        """
+        return self._size
+
+    def get_hits(self):
+        """
+        Returns the number of lookups answered from the cache.
+        """
+        return self._hits
+
+    def get_misses(self):
+        """
+        Returns the number of lookups that had to be worked out.
+        """
+        return self._misses
+
+    def _entry(self, game):
+        """
+        Finds the entry of a game's position, creating an empty one if there is none, and marks it as the most
+        recently used.
+        :param game: The GessGame.
+        :return: The entry, a list of [black, white, player, game state, moves, rings, evaluations].
+        """
+        key = (game.get_hash(), game.get_game_state())
+        position = game.get_bitboards() + (game.get_player(), game.get_game_state())
+        entry = self._entries.get(key)
+        if entry is not None and tuple(entry[:4]) == position:
+            self._entries.move_to_end(key)
+            return entry
+        if entry is not None:       # A hash collision, the new position replaces the old one.
+            self._remove(key)
+        entry = [position[0], position[1], position[2], position[3], None, None, {}]
+        self._entries[key] = entry
+        self._grow(_ENTRY_BYTES)
+        return entry
+
+    def _remove(self, key):
+        """
+        Removes an entry and its memory from the cache.
+        """
+        entry = self._entries.pop(key)
+        self._size -= _entry_size(entry)
+
+    def _grow(self, size):
+        """
+        Accounts for memory added to the cache, then evicts the least recently used entries until it fits the
+        budget. The most recently used entry is always kept.
+        """
+        self._size += size
+        while self._size > self._budget and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+    def get_moves(self, game):
+        """
+        Returns the legal moves of the player to move, like game.generate_moves(encoded=True).
+        :param game: The GessGame.
+        :return: Returns a tuple of the moves encoded like encode_move.
+        """
+        entry = self._entry(game)
+        if entry[4] is None:
+            self._misses += 1
+            entry[4] = tuple(game.generate_moves(encoded=True))
+            self._grow(_MOVE_BYTES * len(entry[4]))
+        else:
+            self._hits += 1
+        return entry[4]
+
+    def get_rings(self, game, player):
+        """
+        Returns the location of every ring held by a player, like game.get_rings.
+        :param game: The GessGame.
+        :param player: "BLACK" or "WHITE".
+        :return: Returns a tuple of the center of each ring, such as ("l3",).
+        """
+        entry = self._entry(game)
+        if entry[5] is None:
+            self._misses += 1
+            entry[5] = (tuple(game.get_rings("BLACK")), tuple(game.get_rings("WHITE")))
+        else:
+            self._hits += 1
+        if player == "BLACK":
+            return entry[5][0]
+        return entry[5][1]
+
+    def get_evaluation(self, game, evaluate, player):
+        """
+        Returns the score of a static evaluation function, such as GessSearch.material_evaluate.
+        :param game: The GessGame.
+        :param evaluate: Function taking (game, player) and returning a score for player. Functions are told
+        apart by their module and name, so that saved scores still match after loading.
+        :param player: "BLACK" or "WHITE", the player the score is for.
+        :return: The score.
+        """
+        entry = self._entry(game)
+        key = (evaluate.__module__, evaluate.__qualname__, player)
+        score = entry[6].get(key)
+        if score is None:
+            self._misses += 1
+            score = evaluate(game, player)
+            entry[6][key] = score
+            self._grow(_EVALUATION_BYTES)
+        else:
+            self._hits += 1
+        return score
+
+    def clear(self):
+        """
+        Removes every entry.
+        :param: None
+        :return: No Return Value.
+        """
+        self._entries.clear()
+        self._size = 0
+
+    def save(self, path):
+        """
+        Saves every entry to a file, least recently used first.
+        :param path: Path of the file.
+        :return: No Return Value.
+        """
+        with open(path, "wb") as cache_file:
+            pickle.dump(list(self._entries.items()), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, path):
+        """
+        Adds the entries of a file written by save, as if they had just been used, evicting entries as needed to
+        stay within the budget. Only load files from a trusted source, as they are read with pickle.
+        :param path: Path of the file.
+        :return: Returns the number of entries loaded.
+        """
+        with open(path, "rb") as cache_file:
+            items = pickle.load(cache_file)
+        for key, entry in items:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._grow(_entry_size(entry))
+        return len(items)
+
+
+def _entry_size(entry):
+    """
+    Returns the approximate memory of an entry, in bytes.
+    """
+    size = _ENTRY_BYTES + _EVALUATION_BYTES * len(entry[6])
+    if entry[4] is not None:
+        size += _MOVE_BYTES * len(entry[4])
+    return size
+
+
+def fill_openings(cache, depth, evaluate=None):
+    """
+    Caches every position reachable from the starting position in up to depth moves.
+    :param cache: The PositionCache.
+    :param depth: Number of moves.
+    :param evaluate: Evaluation function to cache the score of for both players, or None.
+    :return: Returns the number of positions visited.
+    """
+    return _fill(cache, GessGame(), depth, evaluate)
+
+
+def _fill(cache, game, depth, evaluate):
+    """
+    Caches a position and every position reachable from it in up to depth moves, see fill_openings.
+    """
+    moves = cache.get_moves(game)
+    cache.get_rings(game, "BLACK")
+    if evaluate is not None:
+        cache.get_evaluation(game, evaluate, "BLACK")
+        cache.get_evaluation(game, evaluate, "WHITE")
+    visited = 1
+    if depth:
+        for move in moves:
+            game.move_piece(move)
+            visited += _fill(cache, game, depth - 1, evaluate)
+            game.unmake_move()
+    return visited
+
+
+def main():
+    """
+    Builds a file of cached openings from the command line, to be preloaded with PositionCache.load.
+    """
+    parser = argparse.ArgumentParser(description="Build a file of cached Gess opening positions.")
+    parser.add_argument("path", help="file to save the cache to")
+    parser.add_argument("--depth", type=int, default=1, help="moves from the starting position to cache")
+    parser.add_argument("--budget", type=int, default=64, help="memory budget in megabytes")
+    parser.add_argument("--evaluate", action="store_true", help="also cache GessSearch.material_evaluate")
+    arguments = parser.parse_args()
+
+    evaluate = material_evaluate if arguments.evaluate else None
+    cache = PositionCache(arguments.budget * 1024 * 1024)
+    start = time.perf_counter()
+    visited = fill_openings(cache, arguments.depth, evaluate)
+    cache.save(arguments.path)
+    print("%d positions visited, %d cached in about %d bytes, %.2fs" % (
+        visited, len(cache), cache.get_size(), time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
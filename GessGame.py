@@ -2,6 +2,331 @@
 # Date: 06/05/2020
 # Description: Write a class named GessGame for playing an abstract board game called Gess.
 
+import logging
+import random
+import time
+
+# The board is stored as two bitboards, one integer per color. The square self._board[row][column] of the
+# original list of lists is bit (row * 20 + column), so row 0 is rank 20 and column 0 is file "a".
+_SIZE = 20
+_ROW = (1 << _SIZE) - 1                                 # Every square of row 0.
+_FULL = (1 << _SIZE * _SIZE) - 1                        # Every square of the board.
+_FOOTPRINT = 0b111 | 0b111 << _SIZE | 0b111 << 2 * _SIZE   # 3x3 footprint with its top-left square at bit 0.
+_CENTER = 1 << _SIZE + 1                                # Center square of _FOOTPRINT.
+_RING = _FOOTPRINT ^ _CENTER                            # The eight squares surrounding the center.
+_EDGES = _ROW | _ROW << (_SIZE - 1) * _SIZE             # Rows 1 and 20 plus columns a and t.
+for _row in range(_SIZE):
+    _EDGES |= 1 << _row * _SIZE | 1 << _row * _SIZE + _SIZE - 1
+del _row
+_CENTERS = _FULL ^ _EDGES                               # Every square a piece can be centered on.
+_COLUMNS = "abcdefghijklmnopqrst"
+# Every square as the string used by make_move, such as "e3", and back, so converting is a single lookup.
+_NAMES = [_COLUMNS[bit % _SIZE] + str(_SIZE - bit // _SIZE) for bit in range(_SIZE * _SIZE)]
+_BITS = {name: bit for bit, name in enumerate(_NAMES)}
+
+# Bit of each direction inside _FOOTPRINT, in the order check_movement lists them.
+_DIRECTION_BITS = (("NW", 1), ("N", 1 << 1), ("NE", 1 << 2), ("W", 1 << _SIZE), ("E", 1 << _SIZE + 2),
+                   ("SW", 1 << 2 * _SIZE), ("S", 1 << 2 * _SIZE + 1), ("SE", 1 << 2 * _SIZE + 2))
+# Change in [row, column] when a piece moves one space in a direction.
+_STEPS = {"N": (-1, 0), "NE": (-1, 1), "E": (0, 1), "SE": (1, 1),
+          "S": (1, 0), "SW": (1, -1), "W": (0, -1), "NW": (-1, -1)}
+
+# Starting stones of each player, given as (row, columns) on the board.
+_WHITE_SETUP = ((1, (2, 4, 6, 7, 8, 9, 10, 11, 12, 13, 15, 17)),
+                (2, (1, 2, 3, 5, 7, 8, 9, 10, 12, 14, 16, 17, 18)),
+                (3, (2, 4, 6, 7, 8, 9, 10, 11, 12, 13, 15, 17)),
+                (6, (2, 5, 8, 11, 14, 17)))
+_BLACK_SETUP = ((13, (2, 5, 8, 11, 14, 17)),
+                (16, (2, 4, 6, 7, 8, 9, 10, 11, 12, 13, 15, 17)),
+                (17, (1, 2, 3, 5, 7, 8, 9, 10, 12, 14, 16, 17, 18)),
+                (18, (2, 4, 6, 7, 8, 9, 10, 11, 12, 13, 15, 17)))
+_logger = logging.getLogger(__name__)   # Rejected moves are logged at DEBUG level, silent unless configured.
+
+# Zobrist keys: a random 64-bit number for every square and color, plus one for White being the player to move.
+# The seed is fixed so that a position hashes the same way in every process and every run.
+_ZOBRIST_RANDOM = random.Random(20200605)
+_ZOBRIST_BLACK = [_ZOBRIST_RANDOM.getrandbits(64) for _square in range(_SIZE * _SIZE)]
+_ZOBRIST_WHITE = [_ZOBRIST_RANDOM.getrandbits(64) for _square in range(_SIZE * _SIZE)]
+_ZOBRIST_PLAYER = _ZOBRIST_RANDOM.getrandbits(64)
+del _ZOBRIST_RANDOM
+# The XOR of the keys of the stones of every possible byte of a bitboard, so a whole board hashes 50 bytes at a
+# time instead of one stone at a time. _ZOBRIST_BLACK_BYTES[index][value] covers bits index * 8 to index * 8 + 7.
+_ZOBRIST_BLACK_BYTES = [[0] * 256 for _index in range(_SIZE * _SIZE // 8)]
+_ZOBRIST_WHITE_BYTES = [[0] * 256 for _index in range(_SIZE * _SIZE // 8)]
+for _index in range(_SIZE * _SIZE // 8):
+    for _value in range(1, 256):
+        _low = _value & -_value
+        _ZOBRIST_BLACK_BYTES[_index][_value] = (_ZOBRIST_BLACK_BYTES[_index][_value ^ _low] ^
+                                                _ZOBRIST_BLACK[_index * 8 + _low.bit_length() - 1])
+        _ZOBRIST_WHITE_BYTES[_index][_value] = (_ZOBRIST_WHITE_BYTES[_index][_value ^ _low] ^
+                                                _ZOBRIST_WHITE[_index * 8 + _low.bit_length() - 1])
+del _index, _value, _low
+
+
+def _shift(center):
+    """
+    Returns how far _FOOTPRINT has to be shifted to cover the piece with the given center.
+    :param center: Center square: Given as [row, column].
+    :return: The bit of the top-left square of the footprint.
+    """
+    return (center[0] - 1) * _SIZE + center[1] - 1
+
+
+def _render(black, white, bit):
+    """
+    Converts one square of the bitboards to the string used by the list of lists board.
+    :param black: Bitboard of the black stones.
+    :param white: Bitboard of the white stones.
+    :param bit: The square to convert.
+    :return: "|X|" for a black stone, "|O|" for a white stone and "|-|" for an empty square.
+    """
+    if black >> bit & 1:
+        return "|X|"
+    if white >> bit & 1:
+        return "|O|"
+    return "|-|"
+
+
+def _squares(bits):
+    """
+    Lists the squares set in a bitboard.
+    :param bits: Any bitboard.
+    :return: The bit of every set square, lowest first.
+    """
+    squares = []
+    while bits:
+        low = bits & -bits
+        squares.append(low.bit_length() - 1)
+        bits ^= low
+    return squares
+
+
+def _zobrist(black, white):
+    """
+    Combines the Zobrist keys of some stones.
+    :param black: Bitboard of black stones.
+    :param white: Bitboard of white stones.
+    :return: The XOR of the keys of every given stone.
+    """
+    key = 0
+    for bit in _squares(black):
+        key ^= _ZOBRIST_BLACK[bit]
+    for bit in _squares(white):
+        key ^= _ZOBRIST_WHITE[bit]
+    return key
+
+
+def _zobrist_board(black, white):
+    """
+    Hashes whole bitboards a byte at a time, for positions with many stones. Gives the same key as _zobrist.
+    :param black: Bitboard of black stones.
+    :param white: Bitboard of white stones.
+    :return: The XOR of the keys of every given stone.
+    """
+    key = 0
+    for table, value in zip(_ZOBRIST_BLACK_BYTES, black.to_bytes(_SIZE * _SIZE // 8, "little")):
+        key ^= table[value]
+    for table, value in zip(_ZOBRIST_WHITE_BYTES, white.to_bytes(_SIZE * _SIZE // 8, "little")):
+        key ^= table[value]
+    return key
+
+
+def _near(changed):
+    """
+    Finds the centers whose 3x3 footprint touches any of the given squares.
+    :param changed: Bitboard of some squares.
+    :return: Bitboard of the centers within one square of them.
+    """
+    near = changed | changed << 1 | changed >> 1
+    return (near | near << _SIZE | near >> _SIZE) & _CENTERS
+
+
+def _build_rays():
+    """
+    Precomputes, for every center, the footprint of the piece and the squares it can slide to in each direction.
+    :return: Returns (footprints, rays). footprints[bit] is the footprint mask of the piece centered on bit.
+    rays[bit] lists (direction, direction bit, ray) for the eight directions, where the direction bit is the
+    stone that allows the move and the ray lists (destination bit, destination footprint) in order of distance.
+    """
+    footprints = [0] * (_SIZE * _SIZE)
+    rays = [()] * (_SIZE * _SIZE)
+    for bit in _squares(_CENTERS):
+        footprints[bit] = _FOOTPRINT << bit - _SIZE - 1
+    for bit in _squares(_CENTERS):
+        row, column = divmod(bit, _SIZE)
+        center_rays = []
+        for direction, (row_step, column_step) in _STEPS.items():
+            ray = []
+            x = 1
+            while 1 <= row + x * row_step <= 18 and 1 <= column + x * column_step <= 18:
+                destination = bit + x * (row_step * _SIZE + column_step)
+                ray.append((destination, footprints[destination]))
+                x += 1
+            center_rays.append((direction, 1 << bit + row_step * _SIZE + column_step, tuple(ray)))
+        rays[bit] = tuple(center_rays)
+    return footprints, rays
+
+
+def _ring_centers(own, occupied):
+    """
+    Finds every ring of one player at once by shifting the player's stones onto each candidate center.
+    :param own: Bitboard of the player's stones.
+    :param occupied: Bitboard of every stone on the board.
+    :return: Bitboard with a bit set on the center of every ring.
+    """
+    return (own >> 1 & own << 1 & own >> _SIZE - 1 & own << _SIZE - 1 & own >> _SIZE & own << _SIZE &
+            own >> _SIZE + 1 & own << _SIZE + 1 & ~occupied & _CENTERS)
+
+
+_FOOTPRINTS, _RAYS = _build_rays()
+
+
+def _build_paths():
+    """
+    Precomputes, for every center and direction, the squares a piece sweeps over on its way to each distance.
+    Each step along a ray only adds the leading edge of the next footprint, so the masks are built by adding
+    the footprints of the ray one at a time.
+    :return: Returns paths, where paths[bit][direction][distance] is the union of the footprints strictly between
+    the piece centered on bit and its destination. Moving there needs every one of these squares to be empty.
+    """
+    paths = [None] * (_SIZE * _SIZE)
+    for bit in _squares(_CENTERS):
+        center_paths = {}
+        for direction, direction_bit, ray in _RAYS[bit]:
+            swept = 0
+            masks = [0]
+            for destination, footprint in ray:
+                masks.append(swept)
+                swept |= footprint
+            center_paths[direction] = tuple(masks)
+        paths[bit] = center_paths
+    return paths
+
+
+_PATHS = _build_paths()
+
+
+def _build_start():
+    """
+    Works out the starting position once, so that every new game only has to copy it.
+    :return: Returns (black, white, black rings, white rings, hash), the bitboards, ring centers and Zobrist hash
+    of the starting position with Black to move.
+    """
+    black = white = 0
+    for row, columns in _BLACK_SETUP:
+        for column in columns:
+            black |= 1 << row * _SIZE + column
+    for row, columns in _WHITE_SETUP:
+        for column in columns:
+            white |= 1 << row * _SIZE + column
+    return (black, white, _ring_centers(black, black | white), _ring_centers(white, black | white),
+            _zobrist_board(black, white))
+
+
+_START = _build_start()        # Immutable, as every part of it is an int.
+
+# A move is encoded in 16 bits as (index of the piece's center among the 18x18 centers * 8 + direction) * 17
+# + distance - 1. Two plain squares would need 18 bits. _MOVE_STEPS turns the last part of a code back into
+# the change in [row, column], and _MOVE_DELTAS turns the change in bit back into the last part of the code.
+_INTERIOR = _squares(_CENTERS)
+_INTERIOR_INDEX = {bit: index for index, bit in enumerate(_INTERIOR)}
+_MOVE_STEPS = [(row_step * distance, column_step * distance)
+               for row_step, column_step in _STEPS.values() for distance in range(1, 18)]
+_MOVE_DELTAS = {row * _SIZE + column: code for code, (row, column) in enumerate(_MOVE_STEPS)}
+_MOVE_CODES = len(_INTERIOR) * len(_MOVE_STEPS)
+
+
+def _encode(center1, center2):
+    """
+    Encodes a move that is known to be a straight line between two centers.
+    :param center1: Center of the piece, as a bit.
+    :param center2: Center of the new location, as a bit.
+    :return: The 16-bit code of the move.
+    """
+    return _INTERIOR_INDEX[center1] * len(_MOVE_STEPS) + _MOVE_DELTAS[center2 - center1]
+
+
+def _decode(code):
+    """
+    Decodes a move encoded by _encode.
+    :param code: The code of the move.
+    :return: Returns (center1, center2) as bits, or None if code is not the code of a move on the board.
+    """
+    if type(code) is not int or not 0 <= code < _MOVE_CODES:
+        return None
+    index, step = divmod(code, len(_MOVE_STEPS))
+    center1 = _INTERIOR[index]
+    row = center1 // _SIZE + _MOVE_STEPS[step][0]
+    column = center1 % _SIZE + _MOVE_STEPS[step][1]
+    if row < 1 or row > 18 or column < 1 or column > 18:
+        return None
+    return center1, row * _SIZE + column
+
+
+def encode_move(first, second):
+    """
+    Encodes a move as a 16-bit integer, which make_move and move_piece accept instead of two strings.
+    :param first: The center square of the piece being moved, such as "b6".
+    :param second: The center square of the new location of the piece, such as "e9".
+    :return: Returns the code, or False if the squares are not two different centers on a straight line.
+    """
+    center1 = _BITS.get(first)
+    center2 = _BITS.get(second)
+    if center1 not in _INTERIOR_INDEX or center2 not in _INTERIOR_INDEX:
+        return False
+    row = center2 // _SIZE - center1 // _SIZE
+    column = center2 % _SIZE - center1 % _SIZE
+    if row == column == 0 or (row != 0 and column != 0 and abs(row) != abs(column)):
+        return False
+    return _encode(center1, center2)
+
+
+def decode_move(code):
+    """
+    Decodes a move encoded by encode_move.
+    :param code: The code of the move.
+    :return: Returns (first, second) strings, such as ("b6", "e9"), or False if code is not a valid code.
+    """
+    move = _decode(code)
+    if move is None:
+        return False
+    return _NAMES[move[0]], _NAMES[move[1]]
+
+
+def _destinations(center, own, other, rings):
+    """
+    Finds every square the piece on a center can legally move to, following the rules of make_move. The piece is
+    lifted once and each of its directions is walked along its precomputed ray, so the footprints on the way are
+    tested only once for all the destinations behind them.
+    :param center: Center of the piece, as a bit.
+    :param own: Bitboard of the stones of the player to move.
+    :param other: Bitboard of the stones of the other player.
+    :param rings: Bitboard of the ring centers of the player to move.
+    :return: Returns a list of destination bits, empty if the piece cannot move.
+    """
+    footprint = _FOOTPRINTS[center]
+    piece = own & footprint
+    # The footprint must hold stones of the player, none of the other player, and not only the center stone.
+    if not piece or other & footprint or piece == 1 << center:
+        return []
+    # Lifting the piece cannot destroy the player's last ring.
+    rest = (own | other) & ~footprint
+    near = _near(footprint)
+    if not rings & ~near and not _ring_centers(own & ~footprint, rest) & near:
+        return []
+    super = piece >> center & 1
+    destinations = []
+    for direction, direction_bit, ray in _RAYS[center]:
+        if not piece & direction_bit:
+            continue
+        if not super:
+            ray = ray[:3]
+        for destination, destination_footprint in ray:
+            destinations.append(destination)
+            if rest & destination_footprint:
+                break
+    return destinations
+
 
 class GessGame:
     """
@@ -13,9 +338,10 @@ class GessGame:
     current game state.
     2) Allows the current player to resign. No communication with other classes necessary.
     3) Allows the current player to make a move from one spot of the board to another.
-    4) Initialize the initial board state using a list of lists with "B" to represent a black stone and
-    "W" to represent a white stone. Include a display method to print the current board state in an
-    organized manner to allow for testing and debugging.
+    4) Initialize the initial board state using one bitboard per player, where each bit is a square of the
+    20x20 board. Footprints, empty squares and rings are found with masks and shifts. The board can still be
+    rendered as a list of lists with "|X|" for a black stone and "|O|" for a white stone, and a display
+    method prints it in an organized manner to allow for testing and debugging.
     We will probably not need to communicate with other classes.
     """
     def __init__(self):
@@ -24,31 +350,63 @@ class GessGame:
         Sets the current player to "BLACK" as Black is the first player to move.
         Sets the initial board state to the given state in the GessGame Description.
         """
-        self._game_state = "UNFINISHED"
-        self._player = "BLACK"
-        self._board = [["|-|"]*20 for n in range(20)]       # Sets up a 20x20 empty board.
-        # Sets up the initial board state with player O representing white.
-        self._board[1][2] = self._board[1][4] = self._board[1][6] = self._board[1][7] = self._board[1][8] = \
-            self._board[1][9] = self._board[1][10] = self._board[1][11] = self._board[1][12] = self._board[1][13] = \
-            self._board[1][15] = self._board[1][17] = self._board[2][1] = self._board[2][2] = self._board[2][3] = \
-            self._board[2][5] = self._board[2][7] = self._board[2][8] = self._board[2][9] = self._board[2][10] = \
-            self._board[2][12] = self._board[2][14] = self._board[2][16] = self._board[2][17] = self._board[2][18] = \
-            self._board[3][2] = self._board[3][4] = self._board[3][6] = self._board[3][7] = self._board[3][8] = \
-            self._board[3][9] = self._board[3][10] = self._board[3][11] = self._board[3][12] = self._board[3][13] = \
-            self._board[3][15] = self._board[3][17] = self._board[6][2] = self._board[6][5] = self._board[6][8] = \
-            self._board[6][11] = self._board[6][14] = self._board[6][17] = "|O|"
-
-        # Sets up the initial board state with player X representing black.
-        self._board[13][2] = self._board[13][5] = self._board[13][8] = self._board[13][11] = self._board[13][14] = \
-            self._board[13][17] = self._board[16][2] = self._board[16][4] = self._board[16][6] = self._board[16][7] = \
-            self._board[16][8] = self._board[16][9] = self._board[16][10] = self._board[16][11] = \
-            self._board[16][12] = self._board[16][13] = self._board[16][15] = self._board[16][17] = \
-            self._board[17][1] = self._board[17][2] = self._board[17][3] = self._board[17][5] = self._board[17][7] = \
-            self._board[17][8] = self._board[17][9] = self._board[17][10] = self._board[17][12] = \
-            self._board[17][14]= self._board[17][16] = self._board[17][17] = self._board[17][18] = \
-            self._board[18][2] = self._board[18][4] = self._board[18][6] = self._board[18][7] = self._board[18][8] = \
-            self._board[18][9] = self._board[18][10] = self._board[18][11] = self._board[18][12] = \
-            self._board[18][13] = self._board[18][15] = self._board[18][17] = "|X|"
+        self._setup(_START, "BLACK", "UNFINISHED")
+
+    def _setup(self, position, player, game_state):
+        """
+        Sets every data member of a new game.
+        :param position: (black, white, black rings, white rings, hash), like _START.
+        :param player: "BLACK" or "WHITE", the player to move.
+        :param game_state: "UNFINISHED", "BLACK_WON" or "WHITE_WON".
+        :return: No Return Value.
+        """
+        self._game_state = game_state
+        self._player = player
+        # Bitboards of the stones of player X, representing black, and of player O, representing white.
+        # Centers of every ring, kept up to date whenever stones are removed or added.
+        # Zobrist hash of the stones and the player.
+        self._black, self._white, self._black_rings, self._white_rings, self._hash = position
+        # Undo records, one per move, used by unmake_move. Kept as a chain of (record, previous) pairs ending in
+        # None, which is never changed once made, so that snapshots and clones can share it.
+        self._history = None
+        self._last_error = None     # Why make_move last returned False, see get_last_error.
+
+    @classmethod
+    def from_position(cls, black, white, player="BLACK", game_state=None):
+        """
+        Creates a game from any position, such as one returned by get_bitboards. There are no moves to take back.
+        The starting position is never set up, so this costs no more than __init__.
+        :param black: Bitboard of the black stones, see get_bitboards.
+        :param white: Bitboard of the white stones.
+        :param player: "BLACK" or "WHITE", the player to move.
+        :param game_state: "UNFINISHED", "BLACK_WON" or "WHITE_WON", or None to work it out from the rings like
+        make_move does. A game that is won by resignation has to be given its state. The state of a position
+        where a player has no ring left is always the one make_move would give it.
+        :return: The GessGame.
+        """
+        if black & white or (black | white) & ~_CENTERS:
+            raise ValueError("stones must be on different squares, inside the edges of the board")
+        if player not in ("BLACK", "WHITE") or game_state not in (None, "UNFINISHED", "BLACK_WON", "WHITE_WON"):
+            raise ValueError("unknown player or game state")
+        occupied = black | white
+        black_rings = _ring_centers(black, occupied)
+        white_rings = _ring_centers(white, occupied)
+        if not white_rings:
+            rings_state = "BLACK_WON"
+        elif not black_rings:
+            rings_state = "WHITE_WON"
+        else:
+            rings_state = "UNFINISHED"
+        if game_state is None:
+            game_state = rings_state
+        elif rings_state != "UNFINISHED" and game_state != rings_state:
+            raise ValueError("a player without a ring has lost, the game state must be " + rings_state)
+        key = _zobrist_board(black, white)
+        if player == "WHITE":
+            key ^= _ZOBRIST_PLAYER
+        game = cls.__new__(cls)
+        game._setup((black, white, black_rings, white_rings, key), player, game_state)
+        return game
 
     def get_game_state(self):
         """
@@ -66,12 +424,24 @@ class GessGame:
         """
         return self._player
 
+    def get_bitboards(self):
+        """
+        Returns the stones of both players as bitboards, where bit (row * 20 + column) is the square
+        [row, column] of get_board.
+        :param: None
+        :return: Returns (black, white), two ints.
+        """
+        return self._black, self._white
+
     def get_board(self):
         """
-        Returns the current board state.
-        :return: self._board
+        Returns the current board state. The list of lists is rendered from the bitboards only when asked for,
+        so changing it does not change the game.
+        :return: 20 lists of 20 squares, each "|X|", "|O|" or "|-|".
         """
-        return self._board
+        black = self._black
+        white = self._white
+        return [[_render(black, white, row * _SIZE + column) for column in range(_SIZE)] for row in range(_SIZE)]
 
     def display_board(self):
         """
@@ -79,7 +449,7 @@ class GessGame:
         :param: None
         :return: Prints the current board state.
         """
-        for row in self._board:
+        for row in self.get_board():
             print(*row)
 
     def resign_game(self):
@@ -97,98 +467,167 @@ class GessGame:
             else:
                 return False
 
-    def make_move(self, first, second):
+    def make_move(self, first, second=None):
         """
         Represents a move from the "first" parameter to the "second" parameter.
         The two parameters are strings that represent the center square of the piece being moved and the desired
-        new location of the center square.
-        :param first: The center square of the piece being moved, such as "b6".
-        :param second: The center square of the new location piece, such as "e9".
+        new location of the center square. Instead, the move can be given as a single int from encode_move or
+        generate_moves(encoded=True), which skips converting the strings.
+        :param first: The center square of the piece being moved, such as "b6", or an encoded move.
+        :param second: The center square of the new location piece, such as "e9". None for an encoded move.
         :return: Returns False if the move is not legal or if the game is already won.
         Otherwise, make the indicated move, remove any captured stones, update the game state if necessary,
         then return True
         """
-        # Convert the input strings to squares on self._board, i.e. [row, column].
-        center1 = self.convert_string(first)
-        center2 = self.convert_string(second)
+        if second is None:
+            # Fast path: the code already holds two different centers in a straight line.
+            move = _decode(first)
+            if move is None:
+                return self._reject(first, second, "INVALID_SQUARE")
+            center1 = [move[0] // _SIZE, move[0] % _SIZE]
+            center2 = [move[1] // _SIZE, move[1] % _SIZE]
+        else:
+            # Convert the input strings to squares on the board, i.e. [row, column].
+            center1 = self.convert_string(first)
+            center2 = self.convert_string(second)
+            if center1 is False or center2 is False:
+                return self._reject(first, second, "INVALID_SQUARE")
 
-        # Makes sure the inputs are different locations.
-        if first == second:
-            print("Same spot!")
-            return False
+            # Makes sure the inputs are different locations.
+            if first == second:
+                return self._reject(first, second, "SAME_SPOT")
 
         # Make sure inputs are in boundaries.
         if self.check_boundaries(center1) is False:
-            print("First center invalid")
-            return False
+            return self._reject(first, second, "FIRST_CENTER_INVALID")
         if self.check_boundaries(center2) is False:
-            print("Second center invalid")
-            return False
+            return self._reject(first, second, "SECOND_CENTER_INVALID")
 
-        # Piece to be moved.
-        piece = self.return_piece(center1)
+        # Piece to be moved, as the black and white stones of its footprint.
+        piece = self.lift_piece(center1)
+        movements = self.piece_movement(piece)
 
         # Is piece superpiece?
-        if "super" in self.check_movement(piece):
-            print("super")
-            super = True
-        if "super" not in self.check_movement(piece):
-            print("not super")
-            super = False
+        super = "super" in movements
 
         # Check to make sure the game is not already over.
         if self.get_game_state() != "UNFINISHED":
-            print("Game is already over!")
-            return False
+            return self._reject(first, second, "GAME_OVER")
 
         # Checks if the first parameter is a valid piece by the player.
         if self.get_player() == "BLACK":
             if self.is_black_piece(center1) is False:
-                print("Cannot move piece as black player")
-                return False
+                return self._reject(first, second, "NOT_PLAYER_PIECE")
         if self.get_player() == "WHITE":
             if self.is_white_piece(center1) is False:
-                print("Cannot move piece as white player")
-                return False
+                return self._reject(first, second, "NOT_PLAYER_PIECE")
 
         # Check direction and number of spaces.
-        if self.calculates_direction(center1, center2) is False:
-            return False
+        direction = self.calculates_direction(center1, center2)
+        if direction is False:
+            return self._reject(first, second, "NOT_STRAIGHT_LINE")
 
         # Check available movement of the moving piece.
-        if self.calculates_direction(center1, center2) not in self.check_movement(piece):
-            print("that piece cannot move in that direction")
-            return False
+        if direction not in movements:
+            return self._reject(first, second, "DIRECTION_NOT_ALLOWED")
 
-        # Remove first piece.
+        # Remove first piece, keeping the hash of the position before the move for count_repetitions.
+        key = self._hash
         self.remove_piece(center1)
 
         # Check if the player has 0 rings after removing the footprint.
         if self.get_player() == "BLACK":
             if self.check_black_rings() is False:
-                self.add_piece(piece, center1)  # Adds back the removed piece if False.
-                print("Cannot destroy your own ring")
-                return False
+                self.place_piece(piece, center1)    # Adds back the removed piece if False.
+                return self._reject(first, second, "DESTROYS_OWN_RING")
         if self.get_player() == "WHITE":
             if self.check_white_rings() is False:
-                self.add_piece(piece, center1)  # Adds back the removed piece if False.
-                print("Cannot destroy your own ring")
-                return False
+                self.place_piece(piece, center1)    # Adds back the removed piece if False.
+                return self._reject(first, second, "DESTROYS_OWN_RING")
 
         # Check if path is clear.
         if self.is_path_clear(center1, center2, super) is False:
-            self.add_piece(piece, center1)      # Adds back the removed piece if False.
-            print("Path is not clear")
-            return False
+            self.place_piece(piece, center1)        # Adds back the removed piece if False.
+            return self._reject(first, second, "PATH_NOT_CLEAR")
+
+        self._last_error = None
+        self._finish_move(center1, center2, piece, key)
+        return True
+
+    def _reject(self, first, second, reason):
+        """
+        Records why make_move rejected a move, and logs it at DEBUG level.
+        :param first: The first parameter of make_move.
+        :param second: The second parameter of make_move.
+        :param reason: The reason, see get_last_error.
+        :return: Returns False, for make_move to return.
+        """
+        self._last_error = reason
+        _logger.debug("Rejected move %s-%s: %s", first, second, reason)
+        return False
+
+    def get_last_error(self):
+        """
+        Returns why the last call to make_move returned False, instead of printing it.
+        :param: None
+        :return: None if the last move was made, else one of "INVALID_SQUARE", "SAME_SPOT", "FIRST_CENTER_INVALID",
+        "SECOND_CENTER_INVALID", "GAME_OVER", "NOT_PLAYER_PIECE", "NOT_STRAIGHT_LINE", "DIRECTION_NOT_ALLOWED",
+        "DESTROYS_OWN_RING" or "PATH_NOT_CLEAR".
+        """
+        return self._last_error
+
+    def get_last_cleared(self):
+        """
+        Returns the stones the last move that can be taken back removed from the outside rows and columns.
+        :param: None
+        :return: Returns (black, white) bitboards of the cleared stones, or None if there is no such move.
+        """
+        if self._history is None:
+            return None
+        return self._history[0][4]
+
+    def move_piece(self, center1, center2=None):
+        """
+        Moves a piece without checking if the move is legal, for moves already known to be legal such as the
+        ones returned by generate_moves. Captures, edge clearing, the game state and the turn are handled like
+        make_move, and the move can be taken back with unmake_move.
+        :param center1: Center of the piece being moved: Given as [row, column]. Or an encoded move.
+        :param center2: Center of the new location of the piece: Given as [row, column]. None for an encoded move.
+        :return: No Return Value.
+        """
+        if center2 is None:
+            move = _decode(center1)
+            center1 = [move[0] // _SIZE, move[0] % _SIZE]
+            center2 = [move[1] // _SIZE, move[1] % _SIZE]
+        piece = self.lift_piece(center1)
+        key = self._hash
+        self.remove_piece(center1)
+        self._finish_move(center1, center2, piece, key)
 
+    def _finish_move(self, center1, center2, piece, key):
+        """
+        Places a piece that has already been removed from center1 on center2, then updates the game state and
+        the turn. Saves what the move changed so that unmake_move can restore it.
+        :param center1: Center the piece was removed from: Given as [row, column]
+        :param center2: Center of the new location of the piece: Given as [row, column]
+        :param piece: (black, white) stones of the piece, as returned by lift_piece.
+        :param key: get_hash of the position before the piece was removed.
+        :return: No Return Value.
+        """
         # Replace second location with first piece footprint.
-        self.add_piece(piece, center2)
+        captured = self.lift_piece(center2)
+        self.place_piece(piece, center2)
 
         # Remove stones on the outside rows and columns.
-        self._board[0] = self._board[19] = ["|-|", "|-|", "|-|", "|-|", "|-|", "|-|", "|-|", "|-|", "|-|", "|-|",
-                                            "|-|", "|-|", "|-|", "|-|", "|-|", "|-|", "|-|", "|-|", "|-|", "|-|"]
-        for row in self._board:
-            row[0] = row[19] = "|-|"
+        cleared = (self._black & _EDGES, self._white & _EDGES)
+        if cleared[0] or cleared[1]:
+            self._toggle(cleared[0], cleared[1])
+            self._update_rings(cleared[0] | cleared[1])
+
+        # The vacated footprint, the overwritten destination footprint and the cleared edges are enough to
+        # take the move back. The hash is the position before the move, for count_repetitions.
+        self._history = ((center1, center2, piece, captured, cleared, self._player, self._game_state, key),
+                         self._history)
 
         # Check rings.
         if self.check_black_rings() is False:   # If no more black rings
@@ -201,33 +640,219 @@ class GessGame:
                 self._player = "WHITE"
             elif self.get_player() == "WHITE":
                 self._player = "BLACK"
+            self._hash ^= _ZOBRIST_PLAYER
+
+    def unmake_move(self):
+        """
+        Takes back the last move made with make_move or move_piece, restoring the board, the rings, the game
+        state and the current player.
+        :param: None
+        :return: Returns False if there is no move to take back, else returns True.
+        """
+        if self._history is None:
+            return False
+        record, self._history = self._history
+        center1, center2, piece, captured, cleared, player, game_state = record[:7]
+        if cleared[0] or cleared[1]:
+            self._toggle(cleared[0], cleared[1])
+            self._update_rings(cleared[0] | cleared[1])
+        self.place_piece(captured, center2)
+        self.place_piece(piece, center1)
+        if self._player != player:
+            self._hash ^= _ZOBRIST_PLAYER
+        self._player = player
+        self._game_state = game_state
         return True
 
+    def profile(self):
+        """
+        Creates a MoveProfiler for the game, to be used as a context manager around the moves to profile:
+            with game.profile() as profiler:
+                game.make_move("e3", "e6")
+            print(profiler.get_timings(), profiler.get_counters())
+        Outside of it, make_move runs without any profiling code.
+        :param: None
+        :return: The MoveProfiler.
+        """
+        return MoveProfiler(self)
+
+    def snapshot(self):
+        """
+        Takes a snapshot of the game that restore can go back to. The bitboards are immutable ints and the undo
+        records are an unchanging chain, so the snapshot shares both with the game and costs the same however
+        many moves were made.
+        :param: None
+        :return: The snapshot, to be passed to restore unchanged.
+        """
+        return ((self._black, self._white, self._black_rings, self._white_rings, self._hash), self._player,
+                self._game_state, self._history)
+
+    def restore(self, snapshot):
+        """
+        Puts the game back to a snapshot. A snapshot can be restored any number of times, into this game or any
+        other, whatever moves were made or taken back since it was taken.
+        :param snapshot: A snapshot taken by snapshot.
+        :return: No Return Value.
+        """
+        position, player, game_state, history = snapshot
+        self._setup(position, player, game_state)
+        self._history = history
+
+    def clone(self):
+        """
+        Creates an independent copy of the game, sharing the bitboards and undo records like snapshot. Moves made
+        or taken back in either game do not affect the other.
+        :param: None
+        :return: The new GessGame.
+        """
+        game = type(self).__new__(type(self))
+        game.restore(self.snapshot())
+        return game
+
+    def __getstate__(self):
+        """
+        Returns the data members to pickle, with the chain of undo records flattened to a list, newest first.
+        Pickling the chain itself would recurse once per move and fail in long games.
+        """
+        state = self.__dict__.copy()
+        records = []
+        history = self._history
+        while history is not None:
+            record, history = history
+            records.append(record)
+        state["_history"] = records
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restores the data members pickled by __getstate__, rebuilding the chain of undo records.
+        """
+        history = None
+        for record in reversed(state["_history"]):
+            history = (record, history)
+        self.__dict__.update(state)
+        self._history = history
+
+    def generate_moves(self, centers=False, encoded=False):
+        """
+        Finds every legal move of the current player without changing the board.
+        Uses the same rules as make_move: the piece must belong to the player, it can only move in a direction
+        shown by check_movement, only a superpiece can move more than 3 spaces, lifting it must not destroy
+        the player's last ring and every footprint between the two centers must be empty. Each direction is
+        walked along its precomputed ray until the first footprint that is not empty, which is the last
+        square the piece can reach.
+        :param centers: If True, returns the centers as [row, column] for move_piece instead of as strings.
+        :param encoded: If True, returns each move as an int from encode_move instead of as strings.
+        :return: Returns a list of (first, second) strings, such as ("e3", "e6"), that make_move accepts.
+        """
+        if encoded:
+            return [_encode(center1, center2) for center1, center2 in self._legal_moves()]
+        if centers:
+            return [([center1 // _SIZE, center1 % _SIZE], [center2 // _SIZE, center2 % _SIZE])
+                    for center1, center2 in self._legal_moves()]
+        return [(_NAMES[center1], _NAMES[center2]) for center1, center2 in self._legal_moves()]
+
+    def _legal_moves(self):
+        """
+        Finds every legal move of the current player, see generate_moves.
+        :return: Returns a list of (center1, center2) bits.
+        """
+        if self._game_state != "UNFINISHED":
+            return []
+        if self._player == "BLACK":
+            own, other, rings = self._black, self._white, self._black_rings
+        else:
+            own, other, rings = self._white, self._black, self._white_rings
+        moves = []
+        for center in _squares(_near(own)):
+            for destination in _destinations(center, own, other, rings):
+                moves.append((center, destination))
+        return moves
+
+    def random_move(self, rng):
+        """
+        Picks a legal move at random, much faster than choosing from generate_moves, for example for the
+        playouts of a Monte Carlo search. Squares that could hold a piece are drawn until one holds a piece
+        that can move, then one of its destinations is drawn. Each piece that can move is equally likely,
+        whatever its number of destinations, so the moves are not all equally likely.
+        :param rng: random.Random to draw from.
+        :return: Returns the move encoded like encode_move, or None if there is no legal move.
+        """
+        if self._game_state != "UNFINISHED":
+            return None
+        if self._player == "BLACK":
+            own, other, rings = self._black, self._white, self._black_rings
+        else:
+            own, other, rings = self._white, self._black, self._white_rings
+        centers = _squares(_near(own))
+        if not centers:
+            return None
+        # A few draws with replacement usually find a piece. Otherwise every square is tried once, in a random
+        # order, to tell whether there is any legal move.
+        for attempt in range(8):
+            center = centers[rng.randrange(len(centers))]
+            destinations = _destinations(center, own, other, rings)
+            if destinations:
+                return _encode(center, rng.choice(destinations))
+        rng.shuffle(centers)
+        for center in centers:
+            destinations = _destinations(center, own, other, rings)
+            if destinations:
+                return _encode(center, rng.choice(destinations))
+        return None
+
+    def legal_destinations(self, center):
+        """
+        Finds every square the piece on a center can legally move to, for example to show the drag targets of a
+        piece that was picked up. Gives the same answer as calling make_move for every square, in one pass.
+        :param center: The center square of the piece, such as "b6".
+        :return: Returns a list of strings, such as ["b7", "b8"]. Empty if the piece cannot move or the game is
+        already won.
+        """
+        center = self.convert_string(center)
+        if center is False or self._game_state != "UNFINISHED" or self.check_boundaries(center) is False:
+            return []
+        if self._player == "BLACK":
+            own, other, rings = self._black, self._white, self._black_rings
+        else:
+            own, other, rings = self._white, self._black, self._white_rings
+        destinations = _destinations(center[0] * _SIZE + center[1], own, other, rings)
+        return [_NAMES[destination] for destination in destinations]
+
+    def validate_moves(self, moves):
+        """
+        Checks many moves at once without making them. Each piece is looked at once, however many of the moves
+        start from it.
+        :param moves: List of (first, second) strings, like the parameters of make_move.
+        :return: Returns a list with True for each move make_move would accept, else False.
+        """
+        destinations = {}
+        results = []
+        for first, second in moves:
+            if first not in destinations:
+                destinations[first] = set(self.legal_destinations(first))
+            results.append(second in destinations[first])
+        return results
+
     def convert_string(self, string):
         """
-        Converts a specific square on the Gess Board game, which is an input, to the square on self._board.
+        Converts a specific square on the Gess Board game, which is an input, to the square on the board.
         :param string: A square that is being inputted by the user, such as "o18".
-        :return: Returns the square on self._board that the input represents, for example "|O|"
-        """
-        # Use Dictionaries to convert the given row or column to self._board.
-        convert_columns = {
-            "a": 0, "b": 1, "c": 2, "d": 3, "e": 4, "f": 5, "g": 6, "h": 7, "i": 8, "j": 9, "k": 10, "l": 11, "m": 12,
-            "n": 13, "o": 14, "p": 15, "q": 16, "r": 17, "s": 18, "t": 19
-        }
-        convert_rows = {
-            '20': 0, '19': 1, '18': 2, '17': 3, '16': 4, '15': 5, '14': 6, '13': 7, '12': 8, '11': 9, '10': 10, '9': 11,
-            '8': 12, '7': 13, '6': 14, '5': 15, '4': 16, '3': 17, '2': 18, '1': 19
-        }
-        chars = []
-        for char in string:
-            chars.append(char)
-        if len(chars) == 2:
-            row = convert_rows[chars[1]]
-            column = convert_columns[chars[0]]
-        if len(chars) == 3:
-            row = convert_rows[chars[1] + chars[2]]
-            column = convert_columns[chars[0]]
-        return [row, column]
+        :return: Returns the square on the board that the input represents, given as [row, column], or False if
+        the input is not a square such as "u5" or "a21".
+        """
+        bit = _BITS.get(string)
+        if bit is None:
+            return False
+        return [bit // _SIZE, bit % _SIZE]
+
+    def convert_center(self, center):
+        """
+        Converts a square on the board back to the string used by make_move, the opposite of convert_string.
+        :param center: A square given as [row, column], such as [2, 14].
+        :return: Returns the square as a string, such as "o18".
+        """
+        return _NAMES[center[0] * _SIZE + center[1]]
 
     def check_boundaries(self, center):
         """
@@ -241,17 +866,21 @@ class GessGame:
 
     def return_piece(self, center):
         """
-        After converting a string to a location on self._board, use this to convert that location to a 3x3 piece.
+        After converting a string to a location on the board, use this to convert that location to a 3x3 piece.
         :param center: A list [row, column] taken from method: convert_string
         :return: Returns the 3x3 piece with the location being the center square.
         """
-        # Center of this piece would be self._board[center[0]][center[1]]
-        row = center[0]
-        col = center[1]
-        piece = [[self._board[row-1][col-1], self._board[row-1][col], self._board[row-1][col+1]],
-                 [self._board[row][col-1], self._board[row][col], self._board[row][col+1]],
-                 [self._board[row+1][col-1], self._board[row+1][col], self._board[row+1][col+1]]]
-        return piece
+        black, white = self.lift_piece(center)
+        return [[_render(black, white, row * _SIZE + column) for column in range(3)] for row in range(3)]
+
+    def lift_piece(self, center):
+        """
+        Copies the stones in the 3x3 footprint of a given center without changing the board.
+        :param center: Center square: Given as [row, column].
+        :return: Returns (black, white), the stones of each player shifted so the footprint starts at bit 0.
+        """
+        shift = _shift(center)
+        return self._black >> shift & _FOOTPRINT, self._white >> shift & _FOOTPRINT
 
     def print_piece(self, string):
         """
@@ -270,16 +899,11 @@ class GessGame:
         :param center: Given as a list of [row, column]
         :return: Returns True if piece is playable by black, else return False.
         """
-        piece = self.return_piece(center)
-        for row in piece:
-            for sq in row:
-                if sq == "|O|":     # Check for any white pieces in footprint.
-                    return False
-        # If piece is empty.
-        if piece == [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
+        black, white = self.lift_piece(center)
+        if white:           # Check for any white pieces in footprint.
             return False
-        # If the surrounding squares are empty (which means the player can't move).
-        if piece == [["|-|", "|-|", "|-|"], ["|-|", "|X|", "|-|"], ["|-|", "|-|", "|-|"]]:
+        # If piece is empty, or if the surrounding squares are empty (which means the player can't move).
+        if black == 0 or black == _CENTER:
             return False
         return True
 
@@ -289,16 +913,11 @@ class GessGame:
         :param center: Given as a list of [row, column]
         :return: Returns True if piece is playable by white, else return False.
         """
-        piece = self.return_piece(center)
-        for row in piece:
-            for sq in row:
-                if sq == "|X|":     # Check for any white pieces in footprint.
-                    return False
-        # If piece is empty.
-        if piece == [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
+        black, white = self.lift_piece(center)
+        if black:           # Check for any black pieces in footprint.
             return False
-        # If the surrounding squares are empty (which means the player can't move).
-        if piece == [["|-|", "|-|", "|-|"], ["|-|", "|O|", "|-|"], ["|-|", "|-|", "|-|"]]:
+        # If piece is empty, or if the surrounding squares are empty (which means the player can't move).
+        if white == 0 or white == _CENTER:
             return False
         return True
 
@@ -308,11 +927,9 @@ class GessGame:
         :param center: Center square: Given as [row, column].
         :return: No Return Value.
         """
-        row = center[0]
-        col = center[1]
-        self._board[row-1][col-1] = self._board[row-1][col] = self._board[row-1][col+1] = \
-            self._board[row][col-1] = self._board[row][col] = self._board[row][col+1] = \
-            self._board[row+1][col-1] = self._board[row+1][col] = self._board[row+1][col+1] = "|-|"
+        footprint = _FOOTPRINT << _shift(center)
+        self._toggle(self._black & footprint, self._white & footprint)
+        self._update_rings(footprint)
 
     def add_piece(self, piece, center):
         """
@@ -321,17 +938,38 @@ class GessGame:
         :param center: Center of piece: Given as [row, column]
         :return: No Return Value.
         """
-        row = center[0]
-        col = center[1]
-        self._board[row - 1][col - 1] = piece[0][0]
-        self._board[row - 1][col] = piece[0][1]
-        self._board[row - 1][col + 1] = piece[0][2]
-        self._board[row][col - 1] = piece[1][0]
-        self._board[row][col] = piece[1][1]
-        self._board[row][col + 1] = piece[1][2]
-        self._board[row + 1][col - 1] = piece[2][0]
-        self._board[row + 1][col] = piece[2][1]
-        self._board[row + 1][col + 1] = piece[2][2]
+        black = white = 0
+        for row in range(3):
+            for column in range(3):
+                if piece[row][column] == "|X|":
+                    black |= 1 << row * _SIZE + column
+                elif piece[row][column] == "|O|":
+                    white |= 1 << row * _SIZE + column
+        self.place_piece((black, white), center)
+
+    def place_piece(self, piece, center):
+        """
+        Replaces the 3x3 footprint of a given center with a piece taken from method: lift_piece
+        :param piece: (black, white) stones of the piece, as returned by lift_piece.
+        :param center: Center of piece: Given as [row, column]
+        :return: No Return Value.
+        """
+        shift = _shift(center)
+        footprint = _FOOTPRINT << shift
+        self._toggle(self._black & footprint ^ piece[0] << shift, self._white & footprint ^ piece[1] << shift)
+        self._update_rings(footprint)
+
+    def _toggle(self, black, white):
+        """
+        Flips some squares of the bitboards, keeping the Zobrist hash up to date. Every change to the stones
+        goes through this method.
+        :param black: Bitboard of the black squares to flip.
+        :param white: Bitboard of the white squares to flip.
+        :return: No Return Value.
+        """
+        self._black ^= black
+        self._white ^= white
+        self._hash ^= _zobrist(black, white)
 
     def check_movement(self, piece):
         """
@@ -339,24 +977,22 @@ class GessGame:
         :param piece: A 3x3 footprint of a piece.
         :return: Returns a list of movable directions by the piece
         """
-        movements = []
-        if piece[0][0] != "|-|":    # If not empty
-            movements.append("NW")
-        if piece[0][1] != "|-|":
-            movements.append("N")
-        if piece[0][2] != "|-|":
-            movements.append("NE")
-        if piece[1][0] != "|-|":
-            movements.append("W")
-        if piece[1][2] != "|-|":
-            movements.append("E")
-        if piece[2][0] != "|-|":
-            movements.append("SW")
-        if piece[2][1] != "|-|":
-            movements.append("S")
-        if piece[2][2] != "|-|":
-            movements.append("SE")
-        if piece[1][1] != "|-|":
+        occupied = 0
+        for row in range(3):
+            for column in range(3):
+                if piece[row][column] != "|-|":     # If not empty
+                    occupied |= 1 << row * _SIZE + column
+        return self.piece_movement((occupied, 0))
+
+    def piece_movement(self, piece):
+        """
+        Checks the movement availability of a piece taken from method: lift_piece
+        :param piece: (black, white) stones of the piece, as returned by lift_piece.
+        :return: Returns a list of movable directions by the piece, like check_movement.
+        """
+        occupied = piece[0] | piece[1]
+        movements = [direction for direction, bit in _DIRECTION_BITS if occupied & bit]
+        if occupied & _CENTER:
             movements.append("super")
         return movements
 
@@ -400,119 +1036,352 @@ class GessGame:
 
     def is_path_clear(self, center1, center2, super):
         """
-        Checks every space between the locations to make sure every 3x3 footprint is empty.
+        Checks every space between the locations to make sure every 3x3 footprint is empty. The footprints of
+        every path are precomputed as one mask, so the check is a single AND however long the slide is.
         :param center1: First location on board, given as [row, column]
         :param center2: Second location on board, given as [row, column]
         :param super: Helps determine if the moving piece can move over 3 spaces.
         :return: Returns True if path is clear. Else, Returns False.
         """
-        if self.calculates_direction(center1, center2) == "N":
-            spaces = center1[0] - center2[0]
-            if super is False:
-                if spaces > 3:
-                    return False
-            for x in range(1, spaces):
-                if self.return_piece([(center1[0] - x), center1[1]]) != \
-                        [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
-                    return False
-        if self.calculates_direction(center1, center2) == "S":
-            spaces = center2[0] - center1[0]
-            if super is False:
-                if spaces > 3:
-                    return False
-            for x in range(1, spaces):
-                if self.return_piece([(center1[0] + x), center1[1]]) != \
-                        [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
-                    return False
-        if self.calculates_direction(center1, center2) == "W":
-            spaces = center1[1] - center2[1]
-            if super is False:
-                if spaces > 3:
-                    return False
-            for x in range(1, spaces):
-                if self.return_piece([(center1[0]), center1[1] - x]) != \
-                        [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
-                    print("you cannot go west")
-                    return False
-        if self.calculates_direction(center1, center2) == "E":
-            spaces = center2[1] - center1[1]
-            if super is False:
-                if spaces > 3:
-                    return False
-            for x in range(1, spaces):
-                if self.return_piece([center1[0], center1[1] + x]) != \
-                        [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
-                    return False
-        if self.calculates_direction(center1, center2) == "SE":
-            spaces = center2[0] - center1[0]
-            if super is False:
-                if spaces > 3:
-                    return False
-            for x in range(1, spaces):
-                if self.return_piece([center1[0] + x, center1[1] + x]) != \
-                        [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
-                    return False
-        if self.calculates_direction(center1, center2) == "NW":
-            spaces = center1[0] - center2[0]
-            if super is False:
-                if spaces > 3:
-                    return False
-            for x in range(1, spaces):
-                if self.return_piece([center1[0] - x, center1[1] - x]) != \
-                        [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
-                    return False
-        if self.calculates_direction(center1, center2) == "NE":
-            spaces = center1[0] - center2[0]
-            if super is False:
-                if spaces > 3:
-                    return False
-            for x in range(1, spaces):
-                if self.return_piece([center1[0] - x, center1[1] + x]) != \
-                        [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
-                    return False
-        if self.calculates_direction(center1, center2) == "SW":
-            spaces = center2[0] - center1[0]
-            if super is False:
-                if spaces > 3:
-                    return False
-            for x in range(1, spaces):
-                if self.return_piece([center1[0] + x, center1[1] - x]) != \
-                        [["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"], ["|-|", "|-|", "|-|"]]:
-                    return False
-        return True
+        direction = self.calculates_direction(center1, center2)
+        if direction is False:
+            return True
+        spaces = max(abs(center2[0] - center1[0]), abs(center2[1] - center1[1]))
+        if super is False:
+            if spaces > 3:
+                return False
+        return not (self._black | self._white) & _PATHS[center1[0] * _SIZE + center1[1]][direction][spaces]
+
+    def get_hash(self):
+        """
+        Returns a 64-bit Zobrist hash of the current position, covering every stone and the player to move.
+        The same position always has the same hash, so it can be used to find repeated positions or as the
+        key of a TranspositionTable.
+        :param: None
+        :return: The hash, as an int.
+        """
+        return self._hash
+
+    def count_repetitions(self):
+        """
+        Counts how many times the current position already happened earlier in the game.
+        :param: None
+        :return: The number of earlier positions with the same hash.
+        """
+        count = 0
+        history = self._history
+        while history is not None:
+            record, history = history
+            if record[7] == self._hash:
+                count += 1
+        return count
+
+    def _update_rings(self, changed):
+        """
+        Re-examines the rings that could have been made or broken by changing some squares. Only the centers
+        whose 3x3 footprint touches a changed square are looked at, so a footprint being lifted or placed only
+        re-examines the 5x5 block of centers around it.
+        :param changed: Bitboard of the squares that changed.
+        :return: No Return Value.
+        """
+        near = _near(changed)
+        occupied = self._black | self._white
+        self._black_rings = self._black_rings & ~near | _ring_centers(self._black, occupied) & near
+        self._white_rings = self._white_rings & ~near | _ring_centers(self._white, occupied) & near
 
     def check_black_rings(self):
         """
-        Scans the Gess board for any rings held by the black player.
+        Checks whether the black player holds any ring.
         Should not need any parameters.
         :return: Returns True if a black ring is found, returns False if no black ring is found.
         """
-        black_rings = 0
-        for x in range(1, 19):
-            for y in range(1, 19):
-                piece = self.return_piece([x, y])
-                if piece == [["|X|", "|X|", "|X|"], ["|X|", "|-|", "|X|"], ["|X|", "|X|", "|X|"]]:
-                    black_rings += 1
-        if black_rings > 0:
+        if self._black_rings:
             return True
         return False
 
     def check_white_rings(self):
         """
-        Scans the Gess board for any rings held by the black player.
+        Checks whether the white player holds any ring.
         Should not need any parameters.
         :return: Returns True if a white ring is found, returns False if no white ring is found.
         """
-        white_rings = 0
-        for x in range(1,19):
-            for y in range(1,19):
-                piece = self.return_piece([x,y])
-                if piece == [["|O|", "|O|", "|O|"], ["|O|", "|-|", "|O|"], ["|O|", "|O|", "|O|"]]:
-                    white_rings += 1
-        if white_rings > 0:
+        if self._white_rings:
             return True
         return False
 
+    def get_rings(self, player):
+        """
+        Returns the location of every ring held by a player.
+        :param player: "BLACK" or "WHITE".
+        :return: Returns a list of the center of each ring, such as ["l3"].
+        """
+        if player == "BLACK":
+            return [_NAMES[bit] for bit in _squares(self._black_rings)]
+        if player == "WHITE":
+            return [_NAMES[bit] for bit in _squares(self._white_rings)]
+        return False
+
+    def get_ring_count(self, player):
+        """
+        Returns the number of rings held by a player.
+        :param player: "BLACK" or "WHITE".
+        :return: Returns the number of rings.
+        """
+        if player == "BLACK":
+            return bin(self._black_rings).count("1")
+        if player == "WHITE":
+            return bin(self._white_rings).count("1")
+        return False
+
+    def get_stone_count(self, player):
+        """
+        Returns the number of stones a player has on the board.
+        :param player: "BLACK" or "WHITE".
+        :return: Returns the number of stones.
+        """
+        if player == "BLACK":
+            return bin(self._black).count("1")
+        if player == "WHITE":
+            return bin(self._white).count("1")
+        return False
+
+
+class TranspositionTable:
+    """
+    Description: Remembers search results by the hash of the position they were found for.
+    Responsibilities:
+    1) Keep at most a fixed number of entries. Each hash goes in one slot, chosen from the hash, so the memory
+    used never grows past the size given to the init method.
+    2) When two positions want the same slot, decide which one to keep. The "depth" policy keeps whichever
+    result was searched deeper, and the "always" policy keeps the newest one.
+    3) Return the stored result of a position, or None if it was never stored or has been replaced.
+    """
+    def __init__(self, size=65536, policy="depth"):
+        """
+        Creates an empty table.
+        :param size: The maximum number of entries.
+        :param policy: "depth" or "always", see the class description.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        if policy not in ("depth", "always"):
+            raise ValueError("policy must be 'depth' or 'always'")
+        self._size = size
+        self._policy = policy
+        self._slots = [None] * size
+        self._count = 0
+
+    def get_size(self):
+        """
+        Returns the maximum number of entries.
+        :param: None
+        :return: self._size
+        """
+        return self._size
+
+    def get_count(self):
+        """
+        Returns the number of entries currently stored.
+        :param: None
+        :return: self._count
+        """
+        return self._count
+
+    def store(self, key, depth, value, flag="EXACT", move=None):
+        """
+        Stores the result of a search, unless the replacement policy prefers the entry already in its slot.
+        :param key: Hash of the position, such as GessGame.get_hash().
+        :param depth: How deep the position was searched.
+        :param value: The score found for the position.
+        :param flag: "EXACT", "LOWER" or "UPPER", telling whether value is exact or only a bound.
+        :param move: The best move found, if any.
+        :return: Returns True if the entry was stored, else returns False.
+        """
+        index = key % self._size
+        entry = self._slots[index]
+        if entry is None:
+            self._count += 1
+        elif self._policy == "depth" and entry[0] != key and entry[1] > depth:
+            return False
+        self._slots[index] = (key, depth, value, flag, move)
+        return True
+
+    def probe(self, key):
+        """
+        Looks up the stored result of a position.
+        :param key: Hash of the position.
+        :return: Returns (depth, value, flag, move), or None if the position is not stored.
+        """
+        entry = self._slots[key % self._size]
+        if entry is None or entry[0] != key:
+            return None
+        return entry[1:]
+
+    def clear(self):
+        """
+        Removes every entry.
+        :param: None
+        :return: No Return Value.
+        """
+        self._slots = [None] * self._size
+        self._count = 0
+
+
+class MoveProfiler:
+    """
+    Description: Times the phases of make_move on one game and counts the work they do.
+    Responsibilities:
+    1) While enabled, shadow the methods make_move is built from with timed copies on the game instance. While
+    disabled, the game has no such copies and runs the plain class methods, so profiling costs nothing.
+    2) Count the footprints lifted, the ring re-examinations and the footprints tested along paths, along with
+    the moves made, rejected and the edge stones they cleared.
+    Timings are inclusive: a phase called from another phase, such as "rings" from "remove", counts in both.
+    A game cannot be pickled while its profiler is enabled.
+    """
+    # Methods of GessGame that are timed, and the name of their phase.
+    _PHASES = (("make_move", "make_move"), ("convert_string", "convert"), ("check_boundaries", "boundaries"),
+               ("lift_piece", "footprint"), ("piece_movement", "movement"), ("calculates_direction", "direction"),
+               ("remove_piece", "remove"), ("place_piece", "place"), ("_update_rings", "rings"),
+               ("is_path_clear", "path"), ("_finish_move", "finish"))
+
+    def __init__(self, game):
+        """
+        Creates a disabled profiler.
+        :param game: The GessGame to profile.
+        """
+        self._game = game
+        self._enabled = False
+        self.reset()
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+        return False
+
+    def reset(self):
+        """
+        Sets every timing and counter back to zero.
+        :param: None
+        :return: No Return Value.
+        """
+        self._timings = {phase: [0, 0.0] for name, phase in self._PHASES}
+        self._counters = {"footprints": 0, "ring_scans": 0, "ring_centers": 0, "path_footprints": 0,
+                          "moves_made": 0, "moves_rejected": 0, "edge_stones_cleared": 0}
+        self._rejections = {}
+
+    def is_enabled(self):
+        """
+        Returns True while the profiler is enabled.
+        """
+        return self._enabled
+
+    def get_timings(self):
+        """
+        Returns a dict of phase to (calls, seconds), see the class description for the phases.
+        """
+        return {phase: tuple(timing) for phase, timing in self._timings.items()}
+
+    def get_counters(self):
+        """
+        Returns a dict of counter name to count.
+        """
+        return dict(self._counters)
+
+    def get_rejections(self):
+        """
+        Returns a dict of get_last_error reason to the number of moves rejected for it.
+        """
+        return dict(self._rejections)
+
+    def enable(self):
+        """
+        Starts profiling by putting timed copies of the methods of the game on the game instance.
+        :param: None
+        :return: No Return Value.
+        """
+        if self._enabled:
+            return
+        game = self._game
+        for name, phase in self._PHASES:
+            setattr(game, name, self._timed(getattr(game, name), self._timings[phase], name))
+        self._enabled = True
+
+    def disable(self):
+        """
+        Stops profiling, leaving the game with its plain class methods again.
+        :param: None
+        :return: No Return Value.
+        """
+        if not self._enabled:
+            return
+        for name, phase in self._PHASES:
+            delattr(self._game, name)
+        self._enabled = False
+
+    def _timed(self, method, timing, name):
+        """
+        Wraps a bound method of the game so that it is timed and its work counted.
+        :param method: The bound method.
+        :param timing: The [calls, seconds] list of its phase.
+        :param name: Name of the method.
+        :return: The wrapper.
+        """
+        timer = time.perf_counter
+        count = getattr(self, "_count_" + name.lstrip("_"), None)
+
+        def timed(*args):
+            start = timer()
+            try:
+                result = method(*args)
+            finally:
+                timing[0] += 1
+                timing[1] += timer() - start
+            if count is not None:
+                count(args, result)
+            return result
+        return timed
+
+    def _count_make_move(self, args, result):
+        """
+        Counts a move made or rejected, and the edge stones a made move cleared.
+        """
+        if result is False:
+            self._counters["moves_rejected"] += 1
+            reason = self._game.get_last_error()
+            self._rejections[reason] = self._rejections.get(reason, 0) + 1
+        else:
+            self._counters["moves_made"] += 1
+            cleared = self._game.get_last_cleared()
+            self._counters["edge_stones_cleared"] += bin(cleared[0] | cleared[1]).count("1")
+
+    def _count_lift_piece(self, args, result):
+        """
+        Counts a footprint lifted off the board.
+        """
+        self._counters["footprints"] += 1
+
+    def _count_update_rings(self, args, result):
+        """
+        Counts a ring re-examination and the centers it looked at.
+        """
+        self._counters["ring_scans"] += 1
+        self._counters["ring_centers"] += bin(_near(args[0]) & _CENTERS).count("1")
+
+    def _count_is_path_clear(self, args, result):
+        """
+        Counts the footprints between the centers that is_path_clear tested at once.
+        """
+        center1, center2, super = args
+        rows = center2[0] - center1[0]
+        columns = center2[1] - center1[1]
+        spaces = max(abs(rows), abs(columns))
+        if rows and columns and abs(rows) != abs(columns) or super is False and spaces > 3:
+            return
+        self._counters["path_footprints"] += spaces - 1
+
 
 # game = GessGame()
 # game.remove_piece(game.convert_string('i7'))
@@ -523,4 +1392,3 @@ class GessGame:
 # game.make_move('l4', 'k4')
 # game.display_board()
 # print(game.get_game_state())
-
@@ -0,0 +1,135 @@
+# Description: Load-tests a GessServer, reporting the p50 and p99 latency of moves at a given session count.
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from GessGame import GessGame, decode_move
+
+
+async def _request(reader, writer, request):
+    """
+    Sends one request and waits for its response.
+    :param reader: asyncio.StreamReader of the connection.
+    :param writer: asyncio.StreamWriter of the connection.
+    :param request: The request as a dict.
+    :return: Returns the response as a dict.
+    """
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("the server closed the connection")
+    return json.loads(line)
+
+
+async def run_connection(open_connection, sessions, deadline, seed, latencies):
+    """
+    Plays random games on a number of sessions over one connection, a move on each session in turn, until the
+    deadline. A finished game is closed and replaced by a new one, and so is a session whose move is rejected,
+    so the session count stays the same.
+    :param open_connection: Coroutine function returning (reader, writer).
+    :param sessions: Number of sessions of this connection.
+    :param deadline: time.perf_counter() value at which to stop.
+    :param seed: Seed of the random moves.
+    :param latencies: List to append the seconds each move request took to.
+    :return: Returns the number of rejected requests.
+    """
+    rng = random.Random(seed)
+    reader, writer = await open_connection()
+    errors = 0
+    keys = []
+    games = []
+    try:
+        for index in range(sessions):
+            keys.append((await _request(reader, writer, {"op": "new"}))["session"])
+            games.append(GessGame())
+        while time.perf_counter() < deadline:
+            for index, game in enumerate(games):
+                moves = game.generate_moves(encoded=True)
+                if not moves or game.get_game_state() != "UNFINISHED":
+                    await _request(reader, writer, {"op": "close", "session": keys[index]})
+                    keys[index] = (await _request(reader, writer, {"op": "new"}))["session"]
+                    games[index] = GessGame()
+                    continue
+                move = rng.choice(moves)
+                first, second = decode_move(move)
+                start = time.perf_counter()
+                response = await _request(reader, writer, {"op": "move", "session": keys[index], "from": first,
+                                                           "to": second})
+                latencies.append(time.perf_counter() - start)
+                if response["ok"]:
+                    game.move_piece(move)
+                else:       # For example an evicted session, which is replaced by a new one.
+                    errors += 1
+                    keys[index] = (await _request(reader, writer, {"op": "new"}))["session"]
+                    games[index] = GessGame()
+    finally:
+        writer.close()
+    return errors
+
+
+def percentile(values, fraction):
+    """
+    Returns a percentile of a sorted list, by the nearest rank.
+    :param values: Sorted list of numbers, not empty.
+    :param fraction: The percentile as a fraction, 0.5 for the median.
+    :return: The value.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def load_test(open_connection, sessions, connections, seconds):
+    """
+    Runs the load test.
+    :param open_connection: Coroutine function returning (reader, writer) of a new connection to the server.
+    :param sessions: Number of concurrent sessions, spread over the connections.
+    :param connections: Number of connections, each with one request in flight at a time.
+    :param seconds: How long to play for.
+    :return: Returns (sorted move latencies in seconds, number of rejected moves, elapsed seconds).
+    """
+    connections = min(connections, sessions)
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + seconds
+    shares = [sessions // connections + (index < sessions % connections) for index in range(connections)]
+    errors = await asyncio.gather(*(run_connection(open_connection, share, deadline, index, latencies)
+                                    for index, share in enumerate(shares)))
+    latencies.sort()
+    return latencies, sum(errors), time.perf_counter() - start
+
+
+def main():
+    """
+    Load-tests a running server from the command line, printing the move latency and throughput.
+    """
+    parser = argparse.ArgumentParser(description="Load-test a GessServer.")
+    parser.add_argument("--host", default="127.0.0.1", help="host of the server")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port of the server")
+    parser.add_argument("--unix", default=None, help="path of the server's Unix socket instead of TCP")
+    parser.add_argument("--sessions", type=int, default=1000, help="number of concurrent sessions")
+    parser.add_argument("--connections", type=int, default=100, help="number of connections")
+    parser.add_argument("--seconds", type=float, default=10.0, help="how long to play for")
+    arguments = parser.parse_args()
+
+    if arguments.unix is not None:
+        def open_connection():
+            return asyncio.open_unix_connection(arguments.unix)
+    else:
+        def open_connection():
+            return asyncio.open_connection(arguments.host, arguments.port)
+    latencies, errors, elapsed = asyncio.run(load_test(open_connection, arguments.sessions, arguments.connections,
+                                                       arguments.seconds))
+    if not latencies:
+        print("no moves were made", file=sys.stderr)
+        sys.exit(1)
+    print("%d sessions, %d moves, %d rejected in %.2fs: %.0f moves/s, p50 %.2f ms, p99 %.2f ms, max %.2f ms" % (
+        arguments.sessions, len(latencies), errors, elapsed, len(latencies) / elapsed,
+        percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, latencies[-1] * 1000))
+
+
+if __name__ == "__main__":
+    main()
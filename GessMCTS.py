@@ -0,0 +1,335 @@
+# Description: A Monte Carlo tree search player for GessGame, with UCT selection and parallel root searches.
+
+import argparse
+import concurrent.futures
+import math
+import random
+import time
+
+from GessGame import GessGame, decode_move
+from GessSearch import other_player
+
+EXPLORATION = 1.4       # Weight of the exploration term of UCT.
+PLAYOUT_LIMIT = 200     # Moves after which a playout stops and is scored by the rings, then the stones, left.
+_MARGIN = 0.02          # Seconds the searches stop before the deadline, for the last playout and sending results.
+
+
+def _winner(game):
+    """
+    Returns the winner of a finished game, or of a game whose player to move has no legal move and resigns.
+    :param game: The GessGame.
+    :return: "BLACK" or "WHITE".
+    """
+    if game.get_game_state() == "BLACK_WON":
+        return "BLACK"
+    if game.get_game_state() == "WHITE_WON":
+        return "WHITE"
+    return other_player(game.get_player())
+
+
+def playout(game, rng, limit=PLAYOUT_LIMIT):
+    """
+    Plays random moves with GessGame.random_move until the game ends. Leaves the game in its final position.
+    :param game: The GessGame to play from.
+    :param rng: random.Random to draw the moves from.
+    :param limit: Moves after which the playout stops. The player with more rings then wins, or with more stones
+    if the rings are even.
+    :return: Returns "BLACK" or "WHITE", the winner, or None for a draw.
+    """
+    for ply in range(limit):
+        move = game.random_move(rng)
+        if move is None:
+            return _winner(game)
+        game.move_piece(move)
+    if game.get_game_state() != "UNFINISHED":
+        return _winner(game)
+    black = (game.get_ring_count("BLACK"), game.get_stone_count("BLACK"))
+    white = (game.get_ring_count("WHITE"), game.get_stone_count("WHITE"))
+    if black == white:
+        return None
+    return "BLACK" if black > white else "WHITE"
+
+
+class _Node:
+    """
+    Description: A position of the search tree, reached by a move from its parent.
+    """
+    __slots__ = ("move", "player", "key", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, player, key, parent):
+        self.move = move            # The move from the parent, encoded like encode_move. None for the root.
+        self.player = player        # The player who made the move, whose point of view wins are counted from.
+        self.key = key              # get_hash of the position, to find the node again for tree reuse.
+        self.parent = parent
+        self.children = []
+        self.untried = None         # Legal moves not yet expanded, listed the first time the node is selected.
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, exploration):
+        """
+        Returns the child with the highest UCT value.
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+class MCTSResult:
+    """
+    Description: The move chosen by MCTSPlayer.choose and how the search went.
+    """
+    def __init__(self, move, visits, win_rate, playouts, elapsed):
+        """
+        Stores the result of a search.
+        :param move: The move as (first, second) strings for make_move, or None if there was no legal move.
+        :param visits: Number of playouts through the move.
+        :param win_rate: Share of those playouts won by the player to move, draws counting as half a win.
+        :param playouts: Number of playouts of the whole search, over every process.
+        :param elapsed: Seconds the search took.
+        """
+        self._move = move
+        self._visits = visits
+        self._win_rate = win_rate
+        self._playouts = playouts
+        self._elapsed = elapsed
+
+    def get_move(self):
+        """
+        Returns the move as (first, second) strings, or None if there was no legal move.
+        """
+        return self._move
+
+    def get_visits(self):
+        """
+        Returns the number of playouts through the chosen move.
+        """
+        return self._visits
+
+    def get_win_rate(self):
+        """
+        Returns the share of the playouts through the chosen move won by the player to move.
+        """
+        return self._win_rate
+
+    def get_playouts(self):
+        """
+        Returns the number of playouts of the whole search.
+        """
+        return self._playouts
+
+    def get_elapsed(self):
+        """
+        Returns the seconds the search took.
+        """
+        return self._elapsed
+
+    def get_playouts_per_second(self):
+        """
+        Returns the playouts per second, over every process.
+        """
+        if self._elapsed <= 0:
+            return 0.0
+        return self._playouts / self._elapsed
+
+    def __repr__(self):
+        return "MCTSResult(move=%r, visits=%d, win_rate=%.3f, playouts=%d, %.0f playouts/s)" % (
+            self._move, self._visits, self._win_rate, self._playouts, self.get_playouts_per_second())
+
+
+def _search(root, game, deadline, rng, exploration, limit):
+    """
+    Runs UCT iterations from a root until the deadline, always at least one.
+    :param root: The _Node of the game's position.
+    :param game: The GessGame of the root position. It is left as it was.
+    :param deadline: time.monotonic() value at which to stop. The clock is the same in every process.
+    :param rng: random.Random of the playouts and expansions.
+    :param exploration: Weight of the exploration term of UCT.
+    :param limit: Moves after which a playout stops.
+    :return: Returns the number of playouts run.
+    """
+    start = game.snapshot()
+    playouts = 0
+    while True:
+        node = root
+        # Selection: follow UCT down the tree, as long as every move of the node has been expanded.
+        while node.untried is not None and not node.untried and node.children:
+            node = node.select(exploration)
+            game.move_piece(node.move)
+        # Expansion: add one untried move of the node as a new child.
+        if node.untried is None:
+            node.untried = game.generate_moves(encoded=True)
+            rng.shuffle(node.untried)
+        if node.untried:
+            player = game.get_player()
+            move = node.untried.pop()
+            game.move_piece(move)
+            child = _Node(move, player, game.get_hash(), node)
+            node.children.append(child)
+            node = child
+        # Simulation, then backpropagation of the result to every node on the way.
+        winner = playout(game, rng, limit)
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1
+            node = node.parent
+        game.restore(start)
+        playouts += 1
+        if time.monotonic() >= deadline:
+            return playouts
+
+
+def search_root(job):
+    """
+    Runs an independent search of a position until a deadline, in a worker process, for root parallelism.
+    :param job: (game, time.monotonic() value at which to stop, seed, exploration, playout limit).
+    :return: Returns (statistics, playouts), where statistics maps each move of the root, encoded like
+    encode_move, to (visits, wins).
+    """
+    game, deadline, seed, exploration, limit = job
+    root = _Node(None, other_player(game.get_player()), game.get_hash(), None)
+    playouts = _search(root, game, deadline, random.Random(seed), exploration, limit)
+    return {child.move: (child.visits, child.wins) for child in root.children}, playouts
+
+
+class MCTSPlayer:
+    """
+    Description: Chooses moves with Monte Carlo tree search.
+    Responsibilities:
+    1) Grow a UCT tree from the position to move in, with random playouts, until the time budget runs out.
+    2) Keep the tree between moves. The next search starts from the node of the position it is given, if that
+    position was reached within the two moves below the last root, so the playouts already run there count.
+    3) With more than one worker, run independent searches of the same position in a process pool at the same
+    time, then add up the visits and wins of every root move (root parallelism). The tree of this process is
+    the one kept between moves.
+    """
+    def __init__(self, workers=1, exploration=EXPLORATION, playout_limit=PLAYOUT_LIMIT, seed=None):
+        """
+        Sets up the player.
+        :param workers: Number of processes searching each move, this one included.
+        :param exploration: Weight of the exploration term of UCT.
+        :param playout_limit: Moves after which a playout stops and is scored.
+        :param seed: Seed of the random numbers, for repeatable searches with one worker.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self._workers = workers
+        self._exploration = exploration
+        self._playout_limit = playout_limit
+        self._rng = random.Random(seed)
+        self._root = None
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """
+        Shuts down the worker processes, if any were started.
+        :param: None
+        :return: No Return Value.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _reuse(self, game):
+        """
+        Finds the node of the game's position among the last root, its children and their children.
+        :param game: The GessGame to move in.
+        :return: The node, detached from its parent, or a new root if it was not found.
+        """
+        key = game.get_hash()
+        level = [self._root] if self._root is not None else []
+        for depth in range(3):
+            for node in level:
+                if node.key == key:
+                    node.parent = None
+                    return node
+            level = [child for node in level for child in node.children]
+        return _Node(None, other_player(game.get_player()), key, None)
+
+    def choose(self, game, time_ms):
+        """
+        Searches for the best move of the player to move.
+        :param game: The GessGame to move in. It is left as it was.
+        :param time_ms: Time budget in milliseconds.
+        :return: Returns an MCTSResult. Its move is the root move with the most visits, ties going to the most wins.
+        The searches of the worker processes stop at the same deadline as this one, and one that has not
+        answered by then is left out. A late search cannot be stopped and keeps its process until its last
+        playout ends, so the pool has a spare process for every worker, and the next move's searches never
+        queue behind it.
+        """
+        start = time.monotonic()
+        deadline = start + time_ms / 1000
+        if game.get_game_state() != "UNFINISHED" or game.random_move(self._rng) is None:
+            self._root = None
+            return MCTSResult(None, 0, 0.0, 0, time.monotonic() - start)
+        root = self._reuse(game)
+        futures = []
+        if self._workers > 1:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=2 * (self._workers - 1))
+            # Only the position is sent, so the cost does not grow with the moves of the game.
+            position = GessGame.from_position(*game.get_bitboards(), game.get_player(), game.get_game_state())
+            for worker in range(self._workers - 1):
+                job = (position, deadline - _MARGIN, self._rng.getrandbits(32), self._exploration,
+                       self._playout_limit)
+                futures.append(self._executor.submit(search_root, job))
+        playouts = _search(root, game.clone(), deadline - _MARGIN, self._rng, self._exploration, self._playout_limit)
+        statistics = {child.move: [child.visits, child.wins] for child in root.children}
+        done, late = concurrent.futures.wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for future in late:
+            future.cancel()     # Only stops a search that has not started yet.
+        for future in done:
+            worker_statistics, worker_playouts = future.result()
+            playouts += worker_playouts
+            for move, (visits, wins) in worker_statistics.items():
+                totals = statistics.setdefault(move, [0, 0.0])
+                totals[0] += visits
+                totals[1] += wins
+        self._root = root
+        move = max(statistics, key=lambda code: statistics[code])      # Most visits, then most wins.
+        visits, wins = statistics[move]
+        return MCTSResult(decode_move(move), visits, wins / visits, playouts, time.monotonic() - start)
+
+
+def main():
+    """
+    Plays MCTS against itself from the starting position, printing every move and the playouts per second.
+    """
+    parser = argparse.ArgumentParser(description="Play Gess with Monte Carlo tree search.")
+    parser.add_argument("--time-ms", type=int, default=1000, help="time budget per move in milliseconds")
+    parser.add_argument("--workers", type=int, default=1, help="processes searching each move")
+    parser.add_argument("--moves", type=int, default=10, help="moves to play")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random numbers")
+    arguments = parser.parse_args()
+
+    game = GessGame()
+    moves = playouts = 0
+    elapsed = 0.0
+    with MCTSPlayer(arguments.workers, seed=arguments.seed) as player:
+        while moves < arguments.moves and game.get_game_state() == "UNFINISHED":
+            result = player.choose(game, arguments.time_ms)
+            if result.get_move() is None:
+                break
+            moves += 1
+            print("%d. %s %s-%s: %d visits, win rate %.3f, %d playouts, %.0f playouts/s" % (
+                moves, game.get_player(), result.get_move()[0], result.get_move()[1], result.get_visits(),
+                result.get_win_rate(), result.get_playouts(), result.get_playouts_per_second()))
+            game.make_move(*result.get_move())
+            playouts += result.get_playouts()
+            elapsed += result.get_elapsed()
+    print("%s after %d moves, %.0f playouts/s overall" % (
+        game.get_game_state(), moves, playouts / elapsed if elapsed else 0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# Description: Perft move-generation benchmark and correctness check for GessGame.
+#
+# perft(game, depth) counts the positions reached after exactly depth moves. The counts of the positions below
+# are pinned, so any change to move generation, footprints, paths or rings that changes a count is caught, and
+# the nodes per second show whether the change made the engine faster. The hashes kept for count_repetitions are
+# checked too, by shuffling two pieces back and forth from the starting position.
+
+import argparse
+import sys
+import time
+
+from GessGame import GessGame
+
+# Positions as 20 rows from row 20 down to row 1, with "X" for black, "O" for white and "." for empty, then
+# the pinned perft counts by depth. Black is to move in every position.
+POSITIONS = {
+    "start": (None, {1: 319, 2: 97614}),
+    "superpieces": ((
+        "....................",
+        "....................",
+        "...OOO..............",
+        "...O.O.....OOO......",
+        "...OOO.....OOO......",
+        "...........OOO......",
+        "....................",
+        "......O.............",
+        "....................",
+        "........XXX.........",
+        "........XXX.........",
+        "........XXX.....O...",
+        "....................",
+        "..X.........X.X.....",
+        "....................",
+        "..............XXX...",
+        "..............X.X...",
+        "..............XXX...",
+        "....................",
+        "....................",
+    ), {1: 210, 2: 36533, 3: 6450669}),
+    "edge rings": ((
+        "....................",
+        "................OOO.",
+        "................O.O.",
+        "................OOO.",
+        ".............O......",
+        "....................",
+        "..........O.O.......",
+        "....................",
+        "....................",
+        "....................",
+        "....................",
+        "....................",
+        ".....X.X............",
+        "....................",
+        "...X................",
+        "....................",
+        ".XXX................",
+        ".X.X................",
+        ".XXX..X.............",
+        "....................",
+    ), {1: 62, 2: 3596, 3: 205271}),
+    "edge captures": ((
+        "....................",
+        ".O.O.O..O....O...O..",
+        "..X...X.....X.......",
+        "..X...X.......XXX...",
+        "..............X.X...",
+        "..............XXX...",
+        "....................",
+        "....................",
+        "....................",
+        "....................",
+        "...OOO..............",
+        "...O.O..............",
+        "...OOO..............",
+        "....................",
+        "....................",
+        "....................",
+        ".........X..........",
+        "........X.X.........",
+        ".O..O....X...O..O...",
+        "....................",
+    ), {1: 62, 2: 2760, 3: 169124}),
+}
+
+# Moves that bring back the starting position, with Black to move, every 4 moves.
+SHUFFLE = (("c3", "c4"), ("c18", "c17"), ("c4", "c3"), ("c17", "c18"))
+
+
+def load_position(diagram):
+    """
+    Sets up a game from a diagram with GessGame.from_position.
+    :param diagram: 20 strings of 20 squares, see POSITIONS, or None for the starting position.
+    :return: The GessGame, with Black to move.
+    """
+    if diagram is None:
+        return GessGame()
+    black = white = 0
+    for row, line in enumerate(diagram):
+        for column, square in enumerate(line):
+            if square == "X":
+                black |= 1 << row * 20 + column
+            elif square == "O":
+                white |= 1 << row * 20 + column
+    return GessGame.from_position(black, white)
+
+
+def perft(game, depth):
+    """
+    Counts the positions reached after exactly depth moves, using make and unmake. A finished game has no moves,
+    so it only counts when depth is 0.
+    :param game: The GessGame to start from. It is left as it was.
+    :param depth: Number of moves.
+    :return: The number of positions.
+    """
+    if depth == 0:
+        return 1
+    moves = game.generate_moves(encoded=True)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game.move_piece(move)
+        nodes += perft(game, depth - 1)
+        game.unmake_move()
+    return nodes
+
+
+def divide(game, depth):
+    """
+    Counts perft(depth - 1) after each legal move, to find which move a wrong count comes from.
+    :param game: The GessGame to start from. It is left as it was.
+    :param depth: Number of moves, at least 1.
+    :return: Returns a dict of (first, second) strings to counts.
+    """
+    counts = {}
+    for first, second in game.generate_moves():
+        game.make_move(first, second)
+        counts[(first, second)] = perft(game, depth - 1)
+        game.unmake_move()
+    return counts
+
+
+def repetitions(cycles):
+    """
+    Plays SHUFFLE a number of times from the starting position, then counts the earlier times the position
+    happened with count_repetitions.
+    :param cycles: Number of times to play SHUFFLE.
+    :return: The count, which is cycles if the hashes of the moves are right.
+    """
+    game = GessGame()
+    for cycle in range(cycles):
+        for first, second in SHUFFLE:
+            if game.make_move(first, second) is False:
+                raise ValueError("shuffle move %s-%s was rejected: %s" % (first, second, game.get_last_error()))
+    return game.count_repetitions()
+
+
+def main():
+    """
+    Runs perft on every pinned position and reports mismatches and nodes per second. Exits with 1 on a mismatch.
+    """
+    parser = argparse.ArgumentParser(description="Check and time GessGame move generation.")
+    parser.add_argument("--depth", type=int, default=None, help="only run this depth of each position")
+    parser.add_argument("--position", action="append", choices=sorted(POSITIONS), help="only run these positions")
+    arguments = parser.parse_args()
+
+    failed = False
+    total_nodes = 0
+    total_elapsed = 0.0
+    for name in arguments.position or POSITIONS:
+        diagram, counts = POSITIONS[name]
+        game = load_position(diagram)
+        for depth, expected in sorted(counts.items()):
+            if arguments.depth is not None and depth != arguments.depth:
+                continue
+            start = time.perf_counter()
+            nodes = perft(game, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_elapsed += elapsed
+            status = "ok" if nodes == expected else "MISMATCH, expected %d" % expected
+            failed = failed or nodes != expected
+            print("%-14s depth %d: %10d nodes in %7.3fs, %8.0f nodes/s  %s" % (
+                name, depth, nodes, elapsed, nodes / elapsed if elapsed else 0, status))
+    count = repetitions(3)
+    failed = failed or count != 3
+    print("repetitions: %d  %s" % (count, "ok" if count == 3 else "MISMATCH, expected 3"))
+    if total_elapsed:
+        print("total: %d nodes in %.3fs, %.0f nodes/s" % (total_nodes, total_elapsed, total_nodes / total_elapsed))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+# Description: A compact binary format for archiving Gess games, with a streaming writer and reader.
+#
+# A file is a sequence of game records. Each record is an 8-byte header, the moves, then the snapshots:
+#   header    "GS", version (1 byte), result (1 byte), snapshot interval (2 bytes), move count (2 bytes)
+#             The high bit of the result is set if the game ended by the player to move resigning.
+#   moves     one 2-byte code per move, see GessGame.encode_move
+#   snapshots one per snapshot interval moves if the interval is not 0, each made of the black and white
+#             bitboards (50 bytes each) and the player to move (1 byte)
+# Every number is little-endian, so a record's length is known from its header alone.
+
+import argparse
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+
+from GessGame import GessGame
+
+_HEADER = struct.Struct("<2sBBHH")
+_MAGIC = b"GS"
+_VERSION = 1
+_BOARD_BYTES = 50               # 400 squares, one bit each.
+_SNAPSHOT_BYTES = 2 * _BOARD_BYTES + 1
+_RESULTS = ("UNFINISHED", "BLACK_WON", "WHITE_WON")
+_RESIGNED = 0x80                # Flag of the result byte.
+_PLAYERS = ("BLACK", "WHITE")
+
+
+def _record_length(interval, count):
+    """
+    Returns the number of bytes after the header of a record.
+    :param interval: Snapshot interval from the header.
+    :param count: Move count from the header.
+    :return: The length in bytes.
+    """
+    length = 2 * count
+    if interval:
+        length += count // interval * _SNAPSHOT_BYTES
+    return length
+
+
+class GameRecord:
+    """
+    Description: One archived game: its moves, its result and any snapshots of the position.
+    Responsibilities:
+    1) Convert the game to and from its binary record.
+    2) Replay the game into a GessGame.
+    """
+    def __init__(self, moves, result, snapshots=(), interval=0, resigned=False):
+        """
+        Creates a record.
+        :param moves: The moves, encoded like GessGame.encode_move.
+        :param result: The final game state, "UNFINISHED", "BLACK_WON" or "WHITE_WON".
+        :param snapshots: List of (black, white, player) positions, one after every interval moves.
+        :param interval: Number of moves between snapshots, 0 for none.
+        :param resigned: True if the game ended by the player to move after the last move resigning.
+        """
+        if resigned and result == "UNFINISHED":
+            raise ValueError("a resigned game must have a winner")
+        self._moves = moves
+        self._result = result
+        self._snapshots = list(snapshots)
+        self._interval = interval
+        self._resigned = resigned
+
+    def get_moves(self):
+        """
+        Returns the moves, encoded like GessGame.encode_move.
+        """
+        return self._moves
+
+    def get_result(self):
+        """
+        Returns the final game state.
+        """
+        return self._result
+
+    def is_resigned(self):
+        """
+        Returns True if the game ended by resignation rather than by the rules.
+        """
+        return self._resigned
+
+    def get_snapshots(self):
+        """
+        Returns the snapshots as (black, white, player), the position after every interval moves.
+        """
+        return self._snapshots
+
+    def get_interval(self):
+        """
+        Returns the number of moves between snapshots, 0 if there are none.
+        """
+        return self._interval
+
+    def to_bytes(self):
+        """
+        Converts the record to the binary format described at the top of this module.
+        :return: The record as bytes.
+        """
+        moves = array.array("H", self._moves)
+        if sys.byteorder == "big":
+            moves.byteswap()
+        result = _RESULTS.index(self._result)
+        if self._resigned:
+            result |= _RESIGNED
+        parts = [_HEADER.pack(_MAGIC, _VERSION, result, self._interval, len(moves)), moves.tobytes()]
+        for black, white, player in self._snapshots:
+            parts.append(black.to_bytes(_BOARD_BYTES, "little") + white.to_bytes(_BOARD_BYTES, "little") +
+                         bytes((_PLAYERS.index(player),)))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Converts a binary record back to a GameRecord.
+        :param data: The bytes of the record, header included.
+        :return: The GameRecord.
+        """
+        magic, version, result, interval, count = _HEADER.unpack_from(data)
+        body = data[_HEADER.size:]
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("not a Gess game record")
+        moves = array.array("H")
+        moves.frombytes(body[:2 * count])
+        if sys.byteorder == "big":
+            moves.byteswap()
+        snapshots = []
+        for start in range(2 * count, len(body), _SNAPSHOT_BYTES):
+            black = int.from_bytes(body[start:start + _BOARD_BYTES], "little")
+            white = int.from_bytes(body[start + _BOARD_BYTES:start + 2 * _BOARD_BYTES], "little")
+            snapshots.append((black, white, _PLAYERS[body[start + 2 * _BOARD_BYTES]]))
+        return cls(moves.tolist(), _RESULTS[result & ~_RESIGNED], snapshots, interval, bool(result & _RESIGNED))
+
+    def replay(self):
+        """
+        Plays the moves into a new GessGame with make_move.
+        :return: The GessGame after the last move.
+        """
+        game = GessGame()
+        for index, move in enumerate(self._moves):
+            if game.make_move(move) is False:
+                raise ValueError("move %d (%r) was rejected: %s" % (index, move, game.get_last_error()))
+        return game
+
+
+class RecordWriter:
+    """
+    Description: Appends game records to a binary stream, one game at a time.
+    """
+    def __init__(self, stream, interval=0):
+        """
+        Sets up the writer.
+        :param stream: A binary file open for writing.
+        :param interval: Write a snapshot of the position after every interval moves, 0 for none.
+        """
+        self._stream = stream
+        self._interval = interval
+        self._offsets = []
+        self._position = 0
+
+    def get_offsets(self):
+        """
+        Returns the position of every record written so far, relative to where the stream started.
+        """
+        return self._offsets
+
+    def write_game(self, moves, result, resigned=False):
+        """
+        Writes one game. If snapshots are on, the moves are replayed to take them.
+        :param moves: The moves, encoded like GessGame.encode_move.
+        :param result: The final game state.
+        :param resigned: True if the game ended by the player to move resigning.
+        :return: No Return Value.
+        """
+        snapshots = []
+        if self._interval:
+            game = GessGame()
+            for index, move in enumerate(moves, 1):
+                game.move_piece(move)
+                if index % self._interval == 0:
+                    snapshots.append(game.get_bitboards() + (game.get_player(),))
+        data = GameRecord(moves, result, snapshots, self._interval, resigned).to_bytes()
+        self._offsets.append(self._position)
+        self._position += len(data)
+        self._stream.write(data)
+
+
+def read_games(stream):
+    """
+    Reads game records one at a time, so a whole file never has to be in memory.
+    :param stream: A binary file open for reading.
+    :return: A generator of GameRecord.
+    """
+    for data in read_raw_games(stream):
+        yield GameRecord.from_bytes(data)
+
+
+def read_raw_games(stream):
+    """
+    Reads game records one at a time without decoding them, for example to pass them on to other processes.
+    :param stream: A binary file open for reading.
+    :return: A generator of the bytes of each record, header included.
+    """
+    while True:
+        header = stream.read(_HEADER.size)
+        if not header:
+            return
+        if len(header) < _HEADER.size:
+            raise ValueError("truncated game record header")
+        interval, count = _HEADER.unpack(header)[3:]
+        length = _record_length(interval, count)
+        body = stream.read(length)
+        if len(body) < length:
+            raise ValueError("truncated game record")
+        yield header + body
+
+
+class RecordArchive:
+    """
+    Description: Random access to the games of a record file, through a memory map and an offset index.
+    Responsibilities:
+    1) Find where every record starts, by hopping from header to header or by loading a saved index.
+    2) Return game N without reading the games before it.
+    """
+    def __init__(self, path, index_path=None):
+        """
+        Opens a record file.
+        :param path: Path of the record file.
+        :param index_path: Path of an index saved by save_index, if there is one.
+        """
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._map = b""     # An empty file cannot be memory-mapped.
+        self._offsets = array.array("Q")
+        if index_path is not None:
+            with open(index_path, "rb") as index:
+                self._offsets.frombytes(index.read())
+        else:
+            offset = 0
+            while offset < len(self._map):
+                interval, count = _HEADER.unpack_from(self._map, offset)[3:]
+                self._offsets.append(offset)
+                offset += _HEADER.size + _record_length(interval, count)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def get_game(self, index):
+        """
+        Reads one game.
+        :param index: Number of the game, starting at 0.
+        :return: The GameRecord.
+        """
+        offset = self._offsets[index]
+        interval, count = _HEADER.unpack_from(self._map, offset)[3:]
+        return GameRecord.from_bytes(self._map[offset:offset + _HEADER.size + _record_length(interval, count)])
+
+    def save_index(self, index_path):
+        """
+        Saves the offset index so that the next RecordArchive of this file does not have to rebuild it.
+        :param index_path: Path to save the index to.
+        :return: No Return Value.
+        """
+        with open(index_path, "wb") as index:
+            index.write(self._offsets.tobytes())
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        if self._map:
+            self._map.close()
+        self._file.close()
+
+
+def main():
+    """
+    Converts games written by GessRunner to the binary format, or prints a summary of a record file.
+    """
+    parser = argparse.ArgumentParser(description="Pack and inspect binary Gess game records.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="convert GessRunner JSON lines to game records")
+    pack.add_argument("source")
+    pack.add_argument("target")
+    pack.add_argument("--interval", type=int, default=0, help="moves between snapshots, 0 for none")
+    info = commands.add_parser("info", help="summarize a record file")
+    info.add_argument("path")
+    arguments = parser.parse_args()
+
+    if arguments.command == "pack":
+        with open(arguments.source) as source, open(arguments.target, "wb") as target:
+            writer = RecordWriter(target, arguments.interval)
+            for line in source:
+                if line.strip():
+                    game = json.loads(line)
+                    writer.write_game(game["moves"], game["result"], game.get("resigned", False))
+        print("%d games packed" % len(writer.get_offsets()))
+    else:
+        games = moves = 0
+        results = {}
+        with open(arguments.path, "rb") as stream:
+            for record in read_games(stream):
+                games += 1
+                moves += len(record.get_moves())
+                results[record.get_result()] = results.get(record.get_result(), 0) + 1
+        print("%d games, %d moves, results %s" % (games, moves, results))
+
+
+if __name__ == "__main__":
+    main()
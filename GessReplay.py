@@ -0,0 +1,130 @@
+# Description: Re-verifies archives of recorded Gess games against the current rules, across a process pool.
+
+import argparse
+import collections
+import concurrent.futures
+import os
+import sys
+import time
+
+from GessGame import GessGame
+from GessRecord import GameRecord, read_raw_games
+
+
+def verify_game(record):
+    """
+    Replays one game with make_move and checks it still gives the recorded snapshots and result. The final game
+    state must be the recorded result, unless the record says the game ended by resignation: the game must then
+    still be unfinished, and the recorded winner must be the opponent of the player left to move.
+    :param record: The GameRecord.
+    :return: Returns (moves, divergence), the number of moves replayed and None if the game matches, else
+    (move index, description) of the first difference.
+    """
+    game = GessGame()
+    snapshots = record.get_snapshots()
+    interval = record.get_interval()
+    moves = record.get_moves()
+    for index, move in enumerate(moves):
+        if game.make_move(move) is False:
+            return index, (index, "move rejected: %s" % game.get_last_error())
+        if interval and (index + 1) % interval == 0:
+            if game.get_bitboards() + (game.get_player(),) != tuple(snapshots[(index + 1) // interval - 1]):
+                return index + 1, (index, "position differs from snapshot")
+    state = game.get_game_state()
+    result = record.get_result()
+    if record.is_resigned():
+        resigned = "WHITE_WON" if game.get_player() == "BLACK" else "BLACK_WON"
+        if state != "UNFINISHED" or result != resigned:
+            return len(moves), (len(moves), "game state is %s with %s to move, recorded %s by resignation" % (
+                state, game.get_player(), result))
+    elif state != result:
+        return len(moves), (len(moves), "game state is %s, recorded %s" % (state, result))
+    return len(moves), None
+
+
+def verify_chunk(job):
+    """
+    Verifies a chunk of games. Runs in a worker process.
+    :param job: (index of the first game, list of the bytes of each record).
+    :return: Returns (games, moves, divergences), where divergences lists (game index, move index, description).
+    """
+    first, records = job
+    total = 0
+    divergences = []
+    for offset, data in enumerate(records):
+        moves, divergence = verify_game(GameRecord.from_bytes(data))
+        total += moves
+        if divergence is not None:
+            divergences.append((first + offset,) + divergence)
+    return len(records), total, divergences
+
+
+def _chunks(stream, chunk_games):
+    """
+    Groups the raw records of a stream into jobs for verify_chunk.
+    :param stream: A binary file of game records.
+    :param chunk_games: Number of games per job.
+    :return: A generator of (index of the first game, list of records).
+    """
+    first = 0
+    records = []
+    for data in read_raw_games(stream):
+        records.append(data)
+        if len(records) == chunk_games:
+            yield first, records
+            first += len(records)
+            records = []
+    if records:
+        yield first, records
+
+
+def verify_archive(stream, workers=None, chunk_games=256):
+    """
+    Verifies every game of a record stream, sending chunks of games to a process pool. Only a few chunks per
+    worker are read ahead, so memory stays flat however big the archive is.
+    :param stream: A binary file of game records.
+    :param workers: Number of worker processes, one per CPU if None.
+    :param chunk_games: Number of games sent to a worker at a time.
+    :return: A generator of (games, moves, divergences) per chunk, in the order of the archive.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for job in _chunks(stream, chunk_games):
+            pending.append(executor.submit(verify_chunk, job))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main():
+    """
+    Verifies record files from the command line, printing each divergence and the throughput.
+    """
+    parser = argparse.ArgumentParser(description="Replay Gess game records and check them against the rules.")
+    parser.add_argument("paths", nargs="+", help="record files written by GessRecord")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+    parser.add_argument("--chunk", type=int, default=256, help="games sent to a worker at a time")
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    games = moves = diverged = 0
+    for path in arguments.paths:
+        with open(path, "rb") as stream:
+            for chunk_games, chunk_moves, divergences in verify_archive(stream, arguments.workers, arguments.chunk):
+                games += chunk_games
+                moves += chunk_moves
+                diverged += len(divergences)
+                for game_index, move_index, description in divergences:
+                    print("%s: game %d, move %d: %s" % (path, game_index, move_index, description))
+    elapsed = time.perf_counter() - start
+    print("%d games, %d moves, %d divergences in %.2fs: %.1f games/s, %.0f moves/s" % (
+        games, moves, diverged, elapsed, games / elapsed, moves / elapsed), file=sys.stderr)
+    if diverged:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# Description: Plays many games of Gess in parallel across a process pool, for training and regression data.
+
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import time
+
+from GessGame import GessGame, encode_move
+from GessSearch import best_move, material_evaluate
+
+
+class RandomPolicy:
+    """
+    Description: Chooses a random legal move.
+    """
+    def choose(self, game, rng):
+        """
+        Chooses a move for the player to move.
+        :param game: The GessGame to move in.
+        :param rng: random.Random seeded for this game.
+        :return: Returns the move encoded like encode_move, or None if there is no legal move.
+        """
+        moves = game.generate_moves(encoded=True)
+        if not moves:
+            return None
+        return rng.choice(moves)
+
+
+class SearchPolicy:
+    """
+    Description: Chooses the move found by a fixed-depth alpha-beta search, see GessSearch.best_move.
+    """
+    def __init__(self, depth=2, evaluate=material_evaluate):
+        """
+        Sets up the policy.
+        :param depth: Depth of the search.
+        :param evaluate: Evaluation function for the search. Must be a module-level function so it can be sent
+        to the worker processes.
+        """
+        self._depth = depth
+        self._evaluate = evaluate
+
+    def choose(self, game, rng):
+        """
+        Chooses a move for the player to move. The search is deterministic, so rng is not used.
+        :param game: The GessGame to move in.
+        :param rng: random.Random seeded for this game.
+        :return: Returns the move encoded like encode_move, or None if there is no legal move.
+        """
+        move = best_move(game, depth=self._depth, evaluate=self._evaluate).get_move()
+        if move is None:
+            return None
+        return encode_move(move[0], move[1])
+
+
+_RANDOM = RandomPolicy()
+
+
+def play_game(job):
+    """
+    Plays one game. Runs in a worker process.
+    :param job: (index, seed, black policy, white policy, max moves, opening moves). The opening moves are played
+    at random before the policies take over, so that deterministic policies still play different games.
+    :return: Returns (index, seed, result, moves, resigned), where result is the final game state and moves lists
+    every move encoded like encode_move. A player with no legal move resigns, which sets resigned to True. A game
+    stopped at max moves is "UNFINISHED".
+    """
+    index, seed, black_policy, white_policy, max_moves, opening = job
+    rng = random.Random(seed)
+    game = GessGame()
+    moves = []
+    resigned = False
+    while game.get_game_state() == "UNFINISHED" and len(moves) < max_moves:
+        if len(moves) < opening:
+            policy = _RANDOM
+        elif game.get_player() == "BLACK":
+            policy = black_policy
+        else:
+            policy = white_policy
+        move = policy.choose(game, rng)
+        if move is None:
+            game.resign_game()
+            resigned = True
+            break
+        game.move_piece(move)
+        moves.append(move)
+    return index, seed, game.get_game_state(), moves, resigned
+
+
+def play_chunk(jobs):
+    """
+    Plays a chunk of games. Runs in a worker process.
+    :param jobs: List of jobs for play_game.
+    :return: Returns the list of what play_game returned for each job.
+    """
+    return [play_game(job) for job in jobs]
+
+
+def run_games(count, black_policy, white_policy=None, workers=None, seed=0, max_moves=200, opening=0, chunksize=4):
+    """
+    Plays many games across a process pool, yielding each one as soon as it and every game before it finish.
+    Game i is seeded with seed + i, so the games are the same whatever the number of workers. Only a few chunks
+    of games per worker are submitted ahead of the one being yielded, so memory stays flat however many games
+    are played.
+    :param count: Number of games.
+    :param black_policy: Policy of the black player, such as RandomPolicy().
+    :param white_policy: Policy of the white player, the black policy if None.
+    :param workers: Number of worker processes, one per CPU if None.
+    :param seed: Seed of the first game.
+    :param max_moves: Moves after which a game is stopped.
+    :param opening: Number of random moves played before the policies take over.
+    :param chunksize: Number of games sent to a worker at a time.
+    :return: A generator of (index, seed, result, moves, resigned), see play_game.
+    """
+    if white_policy is None:
+        white_policy = black_policy
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for first in range(0, count, chunksize):
+            jobs = [(index, seed + index, black_policy, white_policy, max_moves, opening)
+                    for index in range(first, min(first + chunksize, count))]
+            pending.append(executor.submit(play_chunk, jobs))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main():
+    """
+    Plays games from the command line, writing one JSON line per game and the throughput to stderr.
+    """
+    parser = argparse.ArgumentParser(description="Play many Gess games in parallel.")
+    parser.add_argument("--games", type=int, default=100, help="number of games")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--max-moves", type=int, default=200, help="moves after which a game is stopped")
+    parser.add_argument("--opening", type=int, default=0, help="random moves played before the policies")
+    parser.add_argument("--policy", choices=("random", "search"), default="random", help="policy of both players")
+    parser.add_argument("--depth", type=int, default=1, help="search depth of the search policy")
+    arguments = parser.parse_args()
+
+    if arguments.policy == "search":
+        policy = SearchPolicy(arguments.depth)
+    else:
+        policy = RandomPolicy()
+    start = time.perf_counter()
+    games = moves = 0
+    games_played = run_games(arguments.games, policy, workers=arguments.workers, seed=arguments.seed,
+                             max_moves=arguments.max_moves, opening=arguments.opening)
+    for index, seed, result, game_moves, resigned in games_played:
+        print(json.dumps({"game": index, "seed": seed, "result": result, "resigned": resigned, "moves": game_moves}))
+        games += 1
+        moves += len(game_moves)
+    elapsed = time.perf_counter() - start
+    print("%d games, %d moves in %.2fs: %.1f games/s, %.0f moves/s" % (
+        games, moves, elapsed, games / elapsed, moves / elapsed), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+# Description: An alpha-beta search engine that picks moves for a GessGame.
+
+import argparse
+import time
+
+from GessGame import GessGame, TranspositionTable
+
+WIN_SCORE = 1000000     # Score of a won game, minus the number of moves it takes to win it.
+RING_VALUE = 1000       # Score of each ring more than the other player.
+STONE_VALUE = 10        # Score of each stone more than the other player.
+MOBILITY_VALUE = 1      # Score of each legal move of the player to move.
+MAX_DEPTH = 64          # Deepest iteration tried when only a time budget is given.
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the deadline has passed, to unwind to best_move.
+    """
+
+
+def other_player(player):
+    """
+    Returns the opponent of a player.
+    :param player: "BLACK" or "WHITE".
+    :return: "WHITE" or "BLACK".
+    """
+    if player == "BLACK":
+        return "WHITE"
+    return "BLACK"
+
+
+def _to_table(score, ply):
+    """
+    Converts a score to store in the transposition table. A win or loss is stored as the number of moves it
+    takes from the position itself, not from the root, so the entry is right at whatever ply it is found.
+    :param score: Score from Searcher.search.
+    :param ply: Number of moves made since the root.
+    :return: The score to store.
+    """
+    if score >= WIN_SCORE - MAX_DEPTH:
+        return score + ply
+    if score <= MAX_DEPTH - WIN_SCORE:
+        return score - ply
+    return score
+
+
+def _from_table(score, ply):
+    """
+    Converts a score stored with _to_table back to a score from the root.
+    :param score: Score from the transposition table.
+    :param ply: Number of moves made since the root.
+    :return: The score for Searcher.search.
+    """
+    if score >= WIN_SCORE - MAX_DEPTH:
+        return score - ply
+    if score <= MAX_DEPTH - WIN_SCORE:
+        return score + ply
+    return score
+
+
+def material_evaluate(game, player):
+    """
+    Scores a position by the rings and stones each player has left.
+    :param game: The GessGame to score.
+    :param player: "BLACK" or "WHITE", the player the score is for.
+    :return: Returns a score, higher is better for player.
+    """
+    opponent = other_player(player)
+    return (RING_VALUE * (game.get_ring_count(player) - game.get_ring_count(opponent)) +
+            STONE_VALUE * (game.get_stone_count(player) - game.get_stone_count(opponent)))
+
+
+def mobility_evaluate(game, player):
+    """
+    Scores a position like material_evaluate, plus the number of legal moves of the player to move.
+    :param game: The GessGame to score.
+    :param player: "BLACK" or "WHITE", the player the score is for.
+    :return: Returns a score, higher is better for player.
+    """
+    mobility = MOBILITY_VALUE * len(game.generate_moves(centers=True))
+    if game.get_player() != player:
+        mobility = -mobility
+    return material_evaluate(game, player) + mobility
+
+
+class SearchResult:
+    """
+    Description: The move chosen by best_move and how the search went.
+    Responsibilities:
+    1) Hold the best move, its score and the deepest iteration that was finished.
+    2) Report how many positions were searched and how fast, to track engine performance across releases.
+    """
+    def __init__(self, move, score, depth, nodes, elapsed):
+        """
+        Stores the outcome of a search.
+        :param move: The best move as (first, second) strings, or None if there is no legal move.
+        :param score: Score of the move for the player to move.
+        :param depth: The deepest iteration that was finished.
+        :param nodes: The number of positions searched.
+        :param elapsed: The time the search took, in seconds.
+        """
+        self._move = move
+        self._score = score
+        self._depth = depth
+        self._nodes = nodes
+        self._elapsed = elapsed
+
+    def get_move(self):
+        """
+        Returns the best move as (first, second) strings, such as ("e3", "e6"), or None.
+        """
+        return self._move
+
+    def get_score(self):
+        """
+        Returns the score of the best move for the player to move.
+        """
+        return self._score
+
+    def get_depth(self):
+        """
+        Returns the deepest iteration that was finished.
+        """
+        return self._depth
+
+    def get_nodes(self):
+        """
+        Returns the number of positions searched.
+        """
+        return self._nodes
+
+    def get_elapsed(self):
+        """
+        Returns the time the search took, in seconds.
+        """
+        return self._elapsed
+
+    def get_nodes_per_second(self):
+        """
+        Returns the number of positions searched per second.
+        """
+        if self._elapsed <= 0:
+            return 0
+        return self._nodes / self._elapsed
+
+    def __repr__(self):
+        return "SearchResult(move=%r, score=%r, depth=%r, nodes=%r, nps=%.0f)" % (
+            self._move, self._score, self._depth, self._nodes, self.get_nodes_per_second())
+
+
+class Searcher:
+    """
+    Description: Negamax alpha-beta search of one GessGame, used by best_move.
+    Responsibilities:
+    1) Search the game to a fixed depth with make and unmake, so the game is left as it was found.
+    2) Order moves so the best ones are tried first: the transposition table move, then captures, then moves
+    that land close to one of the opponent's rings.
+    3) Stop with SearchTimeout as soon as the deadline passes.
+    """
+    def __init__(self, game, evaluate, table, deadline):
+        """
+        Sets up a search.
+        :param game: The GessGame to search.
+        :param evaluate: Function taking (game, player) and returning a score for player.
+        :param table: TranspositionTable shared by every iteration.
+        :param deadline: time.perf_counter() value to stop at, or None for no deadline.
+        """
+        self._game = game
+        self._evaluate = evaluate
+        self._table = table
+        self._deadline = deadline
+        self._nodes = 0
+
+    def get_nodes(self):
+        """
+        Returns the number of positions searched so far.
+        """
+        return self._nodes
+
+    def order_moves(self, moves, player, first=None):
+        """
+        Sorts moves so that the most promising ones are searched first.
+        :param moves: List of (center1, center2) pairs from generate_moves(centers=True).
+        :param player: The player making the moves.
+        :param first: A move to put in front of every other move, such as the transposition table move.
+        :return: The sorted list.
+        """
+        game = self._game
+        opponent_stones = 0 if player == "WHITE" else 1     # Index of the opponent in lift_piece.
+        rings = [game.convert_string(ring) for ring in game.get_rings(other_player(player))]
+
+        def priority(move):
+            center2 = move[1]
+            if move == first:
+                return 0
+            captured = bin(game.lift_piece(center2)[opponent_stones]).count("1")
+            if captured:
+                return 1 - captured / 10
+            for ring in rings:
+                if abs(ring[0] - center2[0]) <= 5 and abs(ring[1] - center2[1]) <= 5:
+                    return 2
+            return 3
+        return sorted(moves, key=priority)
+
+    def search(self, depth, alpha, beta, player, ply):
+        """
+        Negamax search with alpha-beta pruning.
+        :param depth: Remaining depth.
+        :param alpha: Lowest score player is already sure of.
+        :param beta: Highest score the opponent will allow.
+        :param player: The player to move in this position.
+        :param ply: Number of moves made since the root.
+        :return: Returns (score, move) with the score for player and the best move, or None at a leaf.
+        """
+        self._nodes += 1
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        game = self._game
+
+        # A finished game is scored by who won it, preferring quicker wins and slower losses.
+        state = game.get_game_state()
+        if state != "UNFINISHED":
+            if state == player + "_WON":
+                return WIN_SCORE - ply, None
+            return ply - WIN_SCORE, None
+        if depth == 0:
+            return self._evaluate(game, player), None
+
+        key = game.get_hash()
+        entry = self._table.probe(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, value, flag, table_move = entry
+            value = _from_table(value, ply)
+            if entry_depth >= depth and ply > 0:
+                if flag == "EXACT":
+                    return value, table_move
+                if flag == "LOWER" and value >= beta:
+                    return value, table_move
+                if flag == "UPPER" and value <= alpha:
+                    return value, table_move
+
+        moves = game.generate_moves(centers=True)
+        if not moves:       # A player who cannot move has to resign.
+            return ply - WIN_SCORE, None
+
+        original_alpha = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        opponent = other_player(player)
+        for move in self.order_moves(moves, player, table_move):
+            game.move_piece(move[0], move[1])
+            try:
+                score = -self.search(depth - 1, -beta, -alpha, opponent, ply + 1)[0]
+            finally:
+                game.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = "UPPER"
+        elif best_score >= beta:
+            flag = "LOWER"
+        else:
+            flag = "EXACT"
+        self._table.store(key, depth, _to_table(best_score, ply), flag, best_move)
+        return best_score, best_move
+
+
+def best_move(game, time_ms=None, depth=None, evaluate=material_evaluate, table=None):
+    """
+    Finds the best move for the player to move, searching one move deeper at a time until the depth is
+    reached or the time runs out. The game is left exactly as it was given.
+    :param game: The GessGame to search.
+    :param time_ms: Hard time budget in milliseconds, or None for no limit.
+    :param depth: Deepest iteration to search, at least 1, or None to keep going until the time runs out.
+    :param evaluate: Function taking (game, player) and returning a score for player.
+    :param table: TranspositionTable to use, for example to keep results between moves. A new one is made
+    if None.
+    :return: Returns a SearchResult. Its move comes from the deepest finished iteration.
+    """
+    if time_ms is None and depth is None:
+        raise ValueError("best_move needs time_ms, depth or both")
+    if depth is not None and depth < 1:
+        raise ValueError("depth must be at least 1")
+    start = time.perf_counter()
+    deadline = None if time_ms is None else start + time_ms / 1000
+    if table is None:
+        table = TranspositionTable()
+    searcher = Searcher(game, evaluate, table, deadline)
+    player = game.get_player()
+
+    moves = game.generate_moves(centers=True)
+    if game.get_game_state() != "UNFINISHED" or not moves:
+        return SearchResult(None, 0, 0, 0, time.perf_counter() - start)
+
+    # Fallback in case the first iteration does not finish in time.
+    move = searcher.order_moves(moves, player)[0]
+    score = 0
+    finished = 0
+    for current in range(1, (MAX_DEPTH if depth is None else depth) + 1):
+        try:
+            current_score, current_move = searcher.search(current, -WIN_SCORE - 1, WIN_SCORE + 1, player, 0)
+        except SearchTimeout:
+            break
+        score, move, finished = current_score, current_move, current
+        if abs(score) >= WIN_SCORE - MAX_DEPTH:      # A forced win or loss was found, searching deeper won't help.
+            break
+    move = (game.convert_center(move[0]), game.convert_center(move[1]))
+    return SearchResult(move, score, finished, searcher.get_nodes(), time.perf_counter() - start)
+
+
+def main():
+    """
+    Searches the starting position, or the position after some moves, and reports the move and engine speed.
+    """
+    parser = argparse.ArgumentParser(description="Find the best move of a Gess position.")
+    parser.add_argument("moves", nargs="*", help="moves to play first, such as e3-e6")
+    parser.add_argument("--time-ms", type=int, default=None, help="time budget in milliseconds")
+    parser.add_argument("--depth", type=int, default=None, help="deepest iteration to search")
+    arguments = parser.parse_args()
+    if arguments.time_ms is None and arguments.depth is None:
+        arguments.time_ms = 1000
+
+    game = GessGame()
+    for move in arguments.moves:
+        first, second = move.split("-")
+        if game.make_move(first, second) is False:
+            parser.error("illegal move: " + move)
+    result = best_move(game, time_ms=arguments.time_ms, depth=arguments.depth)
+    print("move", result.get_move(), "score", result.get_score(), "depth", result.get_depth(),
+          "nodes", result.get_nodes(), "nps", round(result.get_nodes_per_second()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# Description: An asyncio server hosting many concurrent Gess games over line-delimited JSON.
+#
+# Every request is one JSON object on one line, and gets exactly one JSON object on one line back, in order:
+#   {"op": "new"}                                           -> {"ok": true, "session": id, "player", "state"}
+#   {"op": "move", "session": id, "from": "e3", "to": "e6"} -> {"ok": true, "player", "state"}
+#   {"op": "engine", "session": id, "time_ms": 1000}        -> {"ok": true, "from", "to", "player", "state"}
+#   {"op": "moves", "session": id}                          -> {"ok": true, "moves": [["e3", "e6"], ...]}
+#   {"op": "state", "session": id}                          -> {"ok": true, "player", "state", "board"}
+#   {"op": "close", "session": id}                          -> {"ok": true}
+# A failed request gets {"ok": false, "error": reason}, where reason is one of the make_move rejection reasons
+# or BAD_REQUEST, UNKNOWN_SESSION, SESSION_BUSY, SERVER_FULL, ENGINE_BUSY or NO_MOVE.
+#
+# Sessions are not tied to a connection. A session that gets no request for the idle timeout is evicted.
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import secrets
+
+from GessGame import GessGame, decode_move, encode_move
+from GessSearch import best_move
+
+_logger = logging.getLogger(__name__)
+_MAX_LINE = 4096            # Longest request line accepted, in bytes.
+_MAX_DEPTH = 4              # Deepest engine search a request can ask for.
+_MAX_TIME_MS = 10000        # Longest engine search a request can ask for, and the budget of one that does not.
+
+
+def engine_move(game, depth, time_ms):
+    """
+    Searches for the engine's move. Runs in the executor.
+    :param game: A copy of the position of the session's GessGame, without its moves, see GessGame.from_position.
+    :param depth: Depth of the search, see GessSearch.best_move, or None to search until the time runs out.
+    :param time_ms: Time budget of the search in milliseconds.
+    :return: Returns the move encoded like encode_move, or None if there is no legal move.
+    """
+    move = best_move(game, time_ms=time_ms, depth=depth).get_move()
+    if move is None:
+        return None
+    return encode_move(move[0], move[1])
+
+
+class _Session:
+    """
+    Description: One hosted game, when it was last used and whether an engine move is being searched for it.
+    """
+    __slots__ = ("game", "last_used", "busy")
+
+    def __init__(self, now):
+        self.game = GessGame()
+        self.last_used = now
+        self.busy = False
+
+
+class GessServer:
+    """
+    Description: Hosts GessGame sessions for any number of connections.
+    Responsibilities:
+    1) Answer the requests of each connection in order. Moves are validated on the event loop, which is fast,
+    while engine searches run in an executor on a copy of the position.
+    2) Apply backpressure: a connection's next request is only read once its last response was sent, and new
+    sessions and engine searches are refused once their limits are reached instead of queueing without end.
+    3) Evict sessions that have been idle for too long.
+    """
+    def __init__(self, workers=None, max_sessions=10000, idle_timeout=600.0, max_engine_jobs=None):
+        """
+        Sets up the server.
+        :param workers: Number of processes running engine searches, one per CPU if None.
+        :param max_sessions: Number of sessions after which "new" is refused.
+        :param idle_timeout: Seconds without a request after which a session is evicted.
+        :param max_engine_jobs: Number of engine searches running or waiting for a worker after which "engine"
+        is refused, twice the workers if None.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if max_engine_jobs is None:
+            max_engine_jobs = 2 * workers
+        self._workers = workers
+        self._executor = None
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout
+        self._max_engine_jobs = max_engine_jobs
+        self._engine_jobs = 0
+        self._sessions = {}
+        self._handlers = {"move": self._move, "engine": self._engine, "moves": self._moves, "state": self._state,
+                          "close": self._close}
+
+    def get_session_count(self):
+        """
+        Returns the number of sessions currently hosted.
+        """
+        return len(self._sessions)
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        """
+        Listens for connections until cancelled, evicting idle sessions in the background.
+        :param host: Host to listen on.
+        :param port: TCP port to listen on.
+        :param path: Path of a Unix socket to listen on instead of TCP, if given.
+        :return: No Return Value.
+        """
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self._workers) as self._executor:
+            if path is not None:
+                server = await asyncio.start_unix_server(self.handle_connection, path, limit=_MAX_LINE)
+            else:
+                server = await asyncio.start_server(self.handle_connection, host, port, limit=_MAX_LINE)
+            evictor = asyncio.create_task(self._evict_idle())
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                evictor.cancel()
+
+    async def _evict_idle(self):
+        """
+        Removes the sessions idle for longer than the idle timeout, checking a few times per timeout.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._idle_timeout / 4)
+            oldest = loop.time() - self._idle_timeout
+            idle = [key for key, session in self._sessions.items()
+                    if session.last_used < oldest and not session.busy]
+            for key in idle:
+                del self._sessions[key]
+            if idle:
+                _logger.info("Evicted %d idle sessions, %d left", len(idle), len(self._sessions))
+
+    async def handle_connection(self, reader, writer):
+        """
+        Answers the requests of one connection until it closes.
+        :param reader: asyncio.StreamReader of the connection.
+        :param writer: asyncio.StreamWriter of the connection.
+        :return: No Return Value.
+        """
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:      # The line is longer than _MAX_LINE, the stream cannot be resynchronized.
+                    writer.write(b'{"ok": false, "error": "BAD_REQUEST"}\n')
+                    break
+                if not line:
+                    break
+                response = await self.handle_request(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, line):
+        """
+        Answers one request.
+        :param line: The request, one line of JSON.
+        :return: Returns the response as a dict.
+        """
+        try:
+            request = json.loads(line)
+            if request["op"] == "new":
+                return self._new()
+            handler = self._handlers[request["op"]]
+            session = self._sessions.get(request.get("session"))
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return {"ok": False, "error": "BAD_REQUEST"}
+        if session is None:
+            return {"ok": False, "error": "UNKNOWN_SESSION"}
+        if session.busy:
+            return {"ok": False, "error": "SESSION_BUSY"}
+        session.last_used = asyncio.get_running_loop().time()
+        try:
+            return await handler(request, session)
+        except (ValueError, TypeError, KeyError, OverflowError):     # OverflowError for an infinite number.
+            return {"ok": False, "error": "BAD_REQUEST"}
+
+    def _new(self):
+        """
+        Starts a session.
+        """
+        if len(self._sessions) >= self._max_sessions:
+            return {"ok": False, "error": "SERVER_FULL"}
+        key = secrets.token_hex(8)
+        session = _Session(asyncio.get_running_loop().time())
+        self._sessions[key] = session
+        return {"ok": True, "session": key, "player": "BLACK", "state": "UNFINISHED"}
+
+    async def _move(self, request, session):
+        """
+        Makes a move given as two strings.
+        """
+        game = session.game
+        if game.make_move(str(request["from"]), str(request["to"])) is False:
+            return {"ok": False, "error": game.get_last_error()}
+        return {"ok": True, "player": game.get_player(), "state": game.get_game_state()}
+
+    async def _engine(self, request, session):
+        """
+        Lets the engine search a move on a copy of the position, then makes it. The session is busy until then.
+        The search always has a time budget of at most _MAX_TIME_MS, and the depth is only a further limit.
+        """
+        depth = request.get("depth")
+        time_ms = request.get("time_ms")
+        if depth is None and time_ms is None:
+            depth = 2
+        if depth is not None:
+            depth = max(1, min(int(depth), _MAX_DEPTH))
+        time_ms = max(1, min(int(time_ms or _MAX_TIME_MS), _MAX_TIME_MS))
+        if self._engine_jobs >= self._max_engine_jobs:
+            return {"ok": False, "error": "ENGINE_BUSY"}
+        game = session.game
+        # Only the position is sent to the executor, so the cost does not grow with the moves of the game.
+        position = GessGame.from_position(*game.get_bitboards(), game.get_player(), game.get_game_state())
+        self._engine_jobs += 1
+        session.busy = True
+        try:
+            move = await asyncio.get_running_loop().run_in_executor(self._executor, engine_move, position, depth,
+                                                                    time_ms)
+        finally:
+            self._engine_jobs -= 1
+            session.busy = False
+            session.last_used = asyncio.get_running_loop().time()
+        if move is None or game.make_move(move) is False:
+            return {"ok": False, "error": "NO_MOVE"}
+        first, second = decode_move(move)
+        return {"ok": True, "from": first, "to": second, "player": game.get_player(),
+                "state": game.get_game_state()}
+
+    async def _moves(self, request, session):
+        """
+        Lists the legal moves of the player to move.
+        """
+        return {"ok": True, "moves": session.game.generate_moves()}
+
+    async def _state(self, request, session):
+        """
+        Describes the game, with the board as 20 strings from row 20 down, like GessPerft.POSITIONS.
+        """
+        game = session.game
+        symbols = {"|X|": "X", "|O|": "O", "|-|": "."}
+        board = ["".join(symbols[square] for square in row) for row in game.get_board()]
+        return {"ok": True, "player": game.get_player(), "state": game.get_game_state(), "board": board}
+
+    async def _close(self, request, session):
+        """
+        Ends a session.
+        """
+        del self._sessions[request["session"]]
+        return {"ok": True}
+
+
+def main():
+    """
+    Runs the server from the command line until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Host Gess games over line-delimited JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--unix", default=None, help="path of a Unix socket to listen on instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="engine processes, one per CPU by default")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="sessions after which new ones are refused")
+    parser.add_argument("--idle", type=float, default=600.0, help="seconds after which an idle session is evicted")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    server = GessServer(arguments.workers, arguments.max_sessions, arguments.idle)
+    try:
+        asyncio.run(server.serve(arguments.host, arguments.port, arguments.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()